@@ -1,30 +1,76 @@
 """BrainSurgeon API - Session management for OpenClaw."""
 
+import asyncio
+import errno
+import hashlib
+import io
+import itertools
 import json
 import logging
 import os
 import re
 import shutil
+import sqlite3
+import stat
+import tempfile
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone, timedelta
+from functools import lru_cache
 from pathlib import Path
-from typing import Optional
+from typing import Iterable, Iterator, Optional
 
-from fastapi import Depends, FastAPI, HTTPException, Request, Security, status
+from fastapi import Depends, FastAPI, HTTPException, Query, Request, Security, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import FileResponse, JSONResponse, Response
 from fastapi.security import APIKeyHeader
 from pydantic import BaseModel
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 
+# Fast JSON parsing for session files (orjson is optional, falls back to stdlib)
+try:
+    import orjson
+    json_loads = orjson.loads
+
+    def json_dumps(obj, indent: bool = False) -> bytes:
+        """Serialize to UTF-8 JSON bytes."""
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0)
+except ImportError:
+    orjson = None
+    json_loads = json.loads
+
+    def json_dumps(obj, indent: bool = False) -> bytes:
+        """Serialize to UTF-8 JSON bytes."""
+        return json.dumps(obj, ensure_ascii=False, indent=2 if indent else None).encode("utf-8")
+
 # Configuration - OpenClaw agents directory
 OPENCLAW_ROOT = Path(os.environ.get("OPENCLAW_ROOT", "~/.openclaw")).expanduser()
 AGENTS_DIR = OPENCLAW_ROOT / "agents"
 TRASH_DIR = OPENCLAW_ROOT / "trash"
 TRASH_RETENTION_DAYS = 14
+STALE_AFTER_SECONDS = 24 * 3600  # Sessions without activity for this long are stale
+ANALYSIS_CACHE_SIZE = 512  # Max session files with cached analysis
+LIST_SESSIONS_WORKERS = 32  # Threads shared by list requests for analyzing session files
+ANALYZE_BATCH_MAX_IDS = 500  # Max sessions per POST /sessions/analyze request
+READ_ALL_MAX_BYTES = 1 << 20  # Session files smaller than this are read in one call for line scans; bigger ones are streamed
+READ_BUFFER_BYTES = 1 << 20  # Buffer size for streaming large session files
+RAW_CONTENT_MAX_BYTES = 32 << 20  # Largest session file embedded by ?include_raw=true; bigger ones use /raw
+WRITE_BUFFER_BYTES = 1 << 20  # Buffer size for rewriting session files, so each line isn't its own syscall
+APPEND_CHECK_BYTES = 256  # Trailing bytes compared to tell an appended session file from a rewritten one
+# Persistent session analysis cache; set to an empty string to keep the cache in memory only.
+# It lives in BrainSurgeon's own cache directory: OPENCLAW_ROOT belongs to OpenClaw
+CACHE_DIR = Path(os.environ.get("XDG_CACHE_HOME", "~/.cache")).expanduser() / "brainsurgeon"
+ANALYSIS_CACHE_DB = os.environ.get("BRAINSURGEON_CACHE_DB", str(CACHE_DIR / "analysis_cache.db"))
 
 # Security Configuration
-API_KEYS = set(filter(None, os.environ.get("BRAINSURGEON_API_KEYS", "").split(",")))
+API_KEYS = frozenset(filter(None, os.environ.get("BRAINSURGEON_API_KEYS", "").split(",")))
+# Keys are compared by SHA-256 digest so lookup time does not depend on key contents
+API_KEY_HASHES = frozenset(hashlib.sha256(k.encode()).digest() for k in API_KEYS)
 READONLY_MODE = os.environ.get("BRAINSURGEON_READONLY", "false").lower() == "true"
 CORS_ORIGINS = os.environ.get("BRAINSURGEON_CORS_ORIGINS", "http://localhost:8654,http://127.0.0.1:8654").split(",")
 API_KEY_NAME = "X-API-Key"
@@ -40,10 +86,39 @@ if not audit_logger.handlers:
     audit_logger.addHandler(handler)
     audit_logger.setLevel(logging.INFO)
 
+logger = logging.getLogger("brainsurgeon")
+
 # Setup rate limiter
 limiter = Limiter(key_func=get_remote_address)
 
-app = FastAPI(title="BrainSurgeon", version="1.2.0")
+class FastJSONResponse(JSONResponse):
+    """JSON response serialized with orjson when it is installed."""
+
+    def render(self, content) -> bytes:
+        if orjson is None:
+            return super().render(content)
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+def etag_json_response(request: Request, content) -> Response:
+    """Render content as JSON with an ETag, or answer 304 if the client has it.
+
+    Polling clients revalidate (Cache-Control: no-cache) and get an empty
+    304 while nothing changed.
+    """
+    response = FastJSONResponse(content)
+    etag = '"%s"' % hashlib.blake2b(response.body, digest_size=16).hexdigest()
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        if etag in tags or "*" in tags:
+            return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return response
+
+
+app = FastAPI(title="BrainSurgeon", version="1.2.0", default_response_class=FastJSONResponse)
 app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 
@@ -60,7 +135,7 @@ async def verify_api_key(api_key: str = Security(api_key_header)):
             status_code=status.HTTP_403_FORBIDDEN,
             detail=f"API key required. Pass {API_KEY_NAME} header."
         )
-    if api_key not in API_KEYS:
+    if hashlib.sha256(api_key.encode()).digest() not in API_KEY_HASHES:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Invalid API key"
@@ -76,6 +151,9 @@ def require_write_access(api_key: str = Depends(verify_api_key)):
         )
     return api_key
 
+# Path components may only contain alphanumerics, hyphens and underscores
+SAFE_PATH_COMPONENT_RE = re.compile(r'\A[A-Za-z0-9_-]+\Z')
+
 def sanitize_path_component(value: str, field_name: str = "value") -> str:
     """Sanitize path component to prevent path traversal attacks.
     
@@ -86,30 +164,45 @@ def sanitize_path_component(value: str, field_name: str = "value") -> str:
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"{field_name} cannot be empty"
         )
-    # Allow alphanumeric, hyphens, underscores only
-    if not re.match(r'^[a-zA-Z0-9_-]+$', value):
+    # Anchored with \A...\Z so a trailing newline can't slip through;
+    # this also rules out path separators, dots and NUL bytes
+    if not SAFE_PATH_COMPONENT_RE.match(value):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Invalid {field_name}. Only alphanumeric, hyphens, and underscores allowed."
         )
-    # Double-check no path separators slipped through
-    if any(c in value for c in ['/', '\\', '.', '\x00']):
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Invalid characters in {field_name}"
-        )
     return value
 
+class _LazyJson:
+    """Defer JSON serialization of log arguments until the record is emitted."""
+
+    __slots__ = ("obj",)
+
+    def __init__(self, obj):
+        self.obj = obj
+
+    def __str__(self):
+        if orjson is not None:
+            return orjson.dumps(self.obj).decode()
+        return json.dumps(self.obj)
+
+
 def log_action(action: str, agent: str, session_id: str = None, user: str = None, details: dict = None):
     """Log audit event for destructive operations."""
-    msg = f"action={action} agent={agent}"
+    if not audit_logger.isEnabledFor(logging.INFO):
+        return
+    fmt = "action=%s agent=%s"
+    args = [action, agent]
     if session_id:
-        msg += f" session={session_id}"
+        fmt += " session=%s"
+        args.append(session_id)
     if user:
-        msg += f" user={user[:8]}..."  # Truncate for privacy
+        fmt += " user=%s..."  # Truncate for privacy
+        args.append(user[:8])
     if details:
-        msg += f" details={json.dumps(details)}"
-    audit_logger.info(msg)
+        fmt += " details=%s"
+        args.append(_LazyJson(details))
+    audit_logger.info(fmt, *args)
 
 # CORS - locked down to specific origins
 app.add_middleware(
@@ -151,7 +244,7 @@ class SessionDetail(BaseModel):
     label: str
     path: str
     size: int
-    raw_content: str
+    raw_content: Optional[str] = None  # Only with ?include_raw=true, see /raw
     entries: list[dict]
     messages: int = 0
     tool_calls: int = 0
@@ -172,6 +265,10 @@ class SessionDetail(BaseModel):
     outputTokens: Optional[int] = None
 
 
+class AnalyzeSessionsRequest(BaseModel):
+    ids: list[tuple[str, str]]  # (agent, session_id) pairs
+
+
 class PruneRequest(BaseModel):
     keep_recent: int = 3
 
@@ -190,128 +287,728 @@ class DeleteWithSummaryRequest(BaseModel):
     generate_summary: bool = True
 
 
+@contextmanager
+def atomic_write(path: Path):
+    """Write a file through a temp sibling that replaces it when the block exits.
+
+    The data and the directory entry are fsynced, so a crash leaves either
+    the old or the new content rather than a truncated file. Each write
+    gets its own uniquely named temp file, so overlapping writes to the
+    same path never share one; the last to finish wins.
+
+    The replacement keeps the original file's mode, owner and group, so
+    OpenClaw can still write files we rewrote as root. If the owner can't
+    be set, the new content is copied over the original in place instead,
+    which keeps its inode but is not crash-atomic.
+    """
+    try:
+        orig = path.stat()
+    except FileNotFoundError:
+        orig = None
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    tmp_path = Path(tmp_name)
+    try:
+        with open(fd, "wb", buffering=WRITE_BUFFER_BYTES) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+            owned = orig is None or _chown_like(f.fileno(), orig)
+        if not owned:
+            _copy_in_place(tmp_path, path)
+            tmp_path.unlink()
+            return
+        try:
+            shutil.copymode(path, tmp_path)
+        except FileNotFoundError:
+            pass
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    dir_fd = os.open(path.parent, os.O_RDONLY)
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
+
+
+def _chown_like(fd: int, orig: os.stat_result) -> bool:
+    """Give an open file orig's owner and group; False if we aren't allowed to."""
+    st = os.fstat(fd)
+    if (st.st_uid, st.st_gid) == (orig.st_uid, orig.st_gid):
+        return True
+    try:
+        os.fchown(fd, orig.st_uid, orig.st_gid)
+    except PermissionError:
+        return False
+    return True
+
+
+def _copy_in_place(src_path: Path, path: Path):
+    """Overwrite path with src_path's content, keeping path's inode and owner."""
+    with open(src_path, "rb") as src, open(path, "r+b") as dst:
+        shutil.copyfileobj(src, dst, WRITE_BUFFER_BYTES)
+        dst.truncate()
+        dst.flush()
+        os.fsync(dst.fileno())
+
+
+def copy_bytes(src, dst, count: int):
+    """Copy up to count bytes from src's position to dst in large blocks."""
+    while count > 0:
+        block = src.read(min(count, WRITE_BUFFER_BYTES))
+        if not block:
+            break
+        dst.write(block)
+        count -= len(block)
+
+
+# Agent directory listing, rescanned when the agents directory's mtime
+# changes (agents added or removed)
+_agents_cache = {"mtime_ns": None, "value": []}
+
+
 def get_agents() -> list[str]:
     """Get list of agent directories."""
-    if not AGENTS_DIR.exists():
+    try:
+        mtime_ns = AGENTS_DIR.stat().st_mtime_ns
+    except FileNotFoundError:
         return []
-    return [d.name for d in AGENTS_DIR.iterdir() if d.is_dir()]
+    if _agents_cache["mtime_ns"] == mtime_ns:
+        return list(_agents_cache["value"])
+    try:
+        # scandir's is_dir() uses the d_type from the directory read, no extra stat
+        with os.scandir(AGENTS_DIR) as it:
+            agents = [e.name for e in it if e.is_dir()]
+    except FileNotFoundError:
+        agents = []
+    _agents_cache["value"] = agents
+    _agents_cache["mtime_ns"] = mtime_ns
+    return list(agents)
 
 
-def get_agent_sessions(agent: str) -> list[dict]:
-    """Get sessions for a specific agent from sessions.json."""
-    sessions_file = AGENTS_DIR / agent / "sessions" / "sessions.json"
-    if not sessions_file.exists():
-        return []
+# Trash file names grouped by their "{agent}_{session_id}" prefix, rebuilt
+# when the trash directory's mtime changes or after our own trash operations
+_trash_index = {"mtime_ns": None, "files": {}}
+_trash_index_lock = threading.Lock()
+TRASH_SUFFIXES = (".meta.json", ".jsonl")
+
+
+def invalidate_trash_index():
+    """Force the next trash lookup to rescan the trash directory."""
+    _trash_index["mtime_ns"] = None
+
+
+def _trash_prefix(name: str) -> Optional[str]:
+    """Get the "{agent}_{session_id}" part of a trash file name, if it is one."""
+    for suffix in TRASH_SUFFIXES:
+        if name.endswith(suffix):
+            # Trash names end with a _%Y%m%d_%H%M%S timestamp
+            parts = name[:-len(suffix)].rsplit("_", 2)
+            return parts[0] if len(parts) == 3 else None
+    return None
+
+
+def _get_trash_index() -> dict[str, list[str]]:
     try:
-        with open(sessions_file, "r") as f:
-            data = json.load(f)
+        mtime_ns = TRASH_DIR.stat().st_mtime_ns
+    except FileNotFoundError:
+        return {}
+    with _trash_index_lock:
+        if _trash_index["mtime_ns"] != mtime_ns:
+            files = {}
+            with os.scandir(TRASH_DIR) as it:
+                for e in it:
+                    prefix = _trash_prefix(e.name)
+                    if prefix is not None:
+                        files.setdefault(prefix, []).append(e.name)
+            for names in files.values():
+                names.sort()
+            _trash_index["files"] = dict(sorted(files.items()))
+            _trash_index["mtime_ns"] = mtime_ns
+        return _trash_index["files"]
+
+
+def find_trash_files(agent: str, session_id: str, suffix: str) -> list[Path]:
+    """Get trashed files of a session with the given suffix, oldest first."""
+    names = _get_trash_index().get(f"{agent}_{session_id}", [])
+    return [TRASH_DIR / name for name in names if name.endswith(suffix)]
+
+
+def all_trash_files(suffix: str) -> list[Path]:
+    """Get every trash file with the given suffix."""
+    return [TRASH_DIR / name for names in _get_trash_index().values() for name in names if name.endswith(suffix)]
+
+
+class SessionsIndex:
+    """A parsed sessions.json with lookups by sessionId and by parent.
+
+    sessions is the list-with-_key view and session_files pairs each of
+    those with its JSONL file name; by_id maps each sessionId to its first
+    session, keys_by_id to every sessions.json key using it, and children
+    maps a parent_session_id to its child sessions.
+    """
+
+    __slots__ = ("stamp", "data", "sessions", "session_files", "by_id", "keys_by_id", "children")
+
+    def __init__(self, stamp: tuple[int, int], data: dict):
+        self.stamp = stamp
+        self.data = data
+        self.sessions = []
+        self.session_files = []
+        self.by_id = {}
+        self.keys_by_id = {}
+        self.children = {}
         # Convert dict to list of sessions with IDs
-        sessions = []
         for key, value in data.items():
             session = dict(value)
             session["_key"] = key
-            sessions.append(session)
-        return sessions
+            self.sessions.append(session)
+            sid = session.get("sessionId")
+            self.session_files.append((session, f"{session.get('sessionId', 'unknown')}.jsonl"))
+            self.by_id.setdefault(sid, session)
+            self.keys_by_id.setdefault(sid, []).append(key)
+            parent = session.get("parent_session_id")
+            if parent is not None:
+                self.children.setdefault(parent, []).append(session)
+
+
+_EMPTY_SESSIONS_INDEX = SessionsIndex((0, 0), {})
+
+# Parsed sessions.json per file, reused while its mtime and size are unchanged
+_SESSIONS_JSON_CACHE: dict[Path, SessionsIndex] = {}
+_sessions_json_lock = threading.Lock()
+# Serializes our own read-modify-write cycles on sessions.json files
+_sessions_json_write_lock = threading.Lock()
+
+
+def _cache_sessions_json(sessions_file: Path, stamp: tuple[int, int], data: dict) -> SessionsIndex:
+    index = SessionsIndex(stamp, data)
+    with _sessions_json_lock:
+        _SESSIONS_JSON_CACHE[sessions_file] = index
+    return index
+
+
+def _read_sessions_json(sessions_file: Path) -> Optional[SessionsIndex]:
+    """Parse a sessions.json file, memoized on file mtime and size.
+
+    Returns None if the file is missing or unreadable.
+    """
+    try:
+        st = sessions_file.stat()
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+    stamp = (st.st_mtime_ns, st.st_size)
+    with _sessions_json_lock:
+        cached = _SESSIONS_JSON_CACHE.get(sessions_file)
+    if cached is not None and cached.stamp == stamp:
+        return cached
+    try:
+        data = json_loads(sessions_file.read_bytes())
     except (json.JSONDecodeError, IOError):
-        return []
+        return None
+    return _cache_sessions_json(sessions_file, stamp, data)
+
+
+def load_sessions_index(agent: str) -> SessionsIndex:
+    """Get an agent's parsed sessions.json; empty if missing or unreadable."""
+    index = _read_sessions_json(AGENTS_DIR / agent / "sessions" / "sessions.json")
+    return index if index is not None else _EMPTY_SESSIONS_INDEX
 
 
-def analyze_jsonl(filepath: Path) -> dict:
-    """Analyze a JSONL session file."""
-    if not filepath.exists():
-        return {"size": 0, "messages": 0, "tool_calls": 0, "tool_outputs": 0, "entries": [], "models": [], "model": None}
+def update_agent_sessions(agent: str, update) -> bool:
+    """Apply update(data, index) to an agent's sessions.json and write it back atomically.
 
-    size = filepath.stat().st_size
+    update mutates the parsed dict, may consult the SessionsIndex of the
+    unchanged file, and returns whether anything changed. The written state
+    stays cached, so the next read does not re-parse the file. Returns False
+    if sessions.json is missing or unreadable.
+    """
+    sessions_file = AGENTS_DIR / agent / "sessions" / "sessions.json"
+    with _sessions_json_write_lock:
+        index = _read_sessions_json(sessions_file)
+        if index is None:
+            return False
+        data = dict(index.data)
+        if not update(data, index):
+            return True
+        with atomic_write(sessions_file) as f:
+            f.write(json_dumps(data, indent=True))
+        st = sessions_file.stat()
+        _cache_sessions_json(sessions_file, (st.st_mtime_ns, st.st_size), data)
+    return True
+
+
+@lru_cache(maxsize=4096)
+def _parse_iso_timestamp(value: str) -> Optional[float]:
+    try:
+        # Python 3.11+ parses the "Z" suffix natively
+        dt = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+def parse_iso_timestamp(value) -> Optional[float]:
+    """Get POSIX seconds for an ISO 8601 timestamp, None if it doesn't parse.
+
+    Timestamps without an offset are taken as UTC. Parses are memoized, since
+    the same timestamps come back on every listing.
+    """
+    return _parse_iso_timestamp(value) if isinstance(value, str) else None
+
+
+def session_duration(created: Optional[str], updated: Optional[str]) -> Optional[float]:
+    """Get duration in minutes between two ISO timestamps."""
+    start = parse_iso_timestamp(created)
+    end = parse_iso_timestamp(updated)
+    if start is None or end is None:
+        return None
+    return (end - start) / 60
+
+
+def is_stale_timestamp(updated: Optional[str], now: Optional[float] = None) -> bool:
+    """Check whether the last activity is more than STALE_AFTER_SECONDS before now (default: the current time)."""
+    updated_ts = parse_iso_timestamp(updated)
+    if updated_ts is None:
+        return False
+    return (time.time() if now is None else now) - updated_ts > STALE_AFTER_SECONDS
+
+
+# Tool outputs are usually the largest lines in a session. When only counts
+# are needed, a large line whose header reads like an OpenClaw tool output
+#   {"type":"message","id":...,"parentId":...,"timestamp":"...","message":{"role":"toolResult",...
+#   {"type":"tool_result","timestamp":"...",...
+# is counted from the header alone instead of being parsed. A toolResult
+# message line is only skipped like this if it holds none of the keys the
+# parse counts models and tool calls from, so both paths agree.
+LARGE_LINE_BYTES = 4096
+LINE_HEADER_BYTES = 512
+TOOL_OUTPUT_HEADER_RE = re.compile(
+    rb'\{\s*"type"\s*:\s*"(message|tool_result|tool)"\s*,'
+    rb'(?:\s*"(?:id|parentId)"\s*:\s*(?:"[^"\\]*"|null)\s*,)*'
+    rb'\s*"timestamp"\s*:\s*"([^"\\]*)"\s*,'
+    rb'(\s*"message"\s*:\s*\{\s*"role"\s*:\s*"toolResult"\s*,)?'
+)
+COUNTED_MESSAGE_KEYS = (b'"model"', b'"toolCall"', b'"tool_calls"')
+# A line can only hold an assistant response with string content, which is
+# what light prune shortens, if it has both of these somewhere
+ASSISTANT_ROLE_BYTES = b'"assistant"'
+STRING_CONTENT_RE = re.compile(rb'"content"\s*:\s*"')
+
+
+def _scan_lines(lines: Iterable[bytes], size: int, entries: Optional[list] = None) -> dict:
+    """Scan JSONL lines once for counts, models and first/last timestamps.
+
+    Parsed entries are appended to entries when a list is given; otherwise
+    large tool output lines are counted without parsing them.
+    """
     messages = 0
     tool_calls = 0
     tool_outputs = 0
-    entries = []
     models = set()
-
-    with open(filepath, "r", encoding="utf-8") as f:
-        for line in f:
-            line = line.strip()
-            if not line:
+    last_model = None
+    # Detail view counts: every message entry, tool calls inside messages,
+    # and models announced by model-snapshot entries
+    message_entries = 0
+    message_tool_calls = 0
+    snapshot_models = set()
+    first_ts = None
+    last_ts = None
+
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        if entries is None and len(line) > LARGE_LINE_BYTES and line.endswith(b"}"):
+            header = TOOL_OUTPUT_HEADER_RE.match(line, 0, LINE_HEADER_BYTES)
+            if header and header.group(1) == b"message" and (
+                not header.group(3) or any(key in line for key in COUNTED_MESSAGE_KEYS)
+            ):
+                header = None
+            if header:
+                if header.group(1) == b"message":
+                    message_entries += 1
+                tool_outputs += 1
+                if header.group(2):
+                    ts = header.group(2).decode("utf-8", errors="replace")
+                    if first_ts is None:
+                        first_ts = ts
+                    last_ts = ts
                 continue
-            try:
-                entry = json.loads(line)
+        try:
+            entry = json_loads(line)
+            if entries is not None:
                 entries.append(entry)
-                
-                # Handle OpenClaw session format
-                entry_type = entry.get("type", "")
-                
-                if entry_type == "message":
-                    msg = entry.get("message", {})
-                    role = msg.get("role", "")
-                    if role in ("user", "assistant"):
-                        messages += 1
-                    if role == "toolResult":
-                        tool_outputs += 1
-                    # Extract model from message
-                    model = msg.get("model")
-                    if model:
-                        models.add(model)
-                    # Count tool calls in message content array
-                    content = msg.get("content", [])
-                    if isinstance(content, list):
-                        for item in content:
-                            if isinstance(item, dict) and item.get("type") == "toolCall":
-                                tool_calls += 1
-                    # Also check for tool_calls field
-                    if msg.get("tool_calls"):
-                        tool_calls += len(msg["tool_calls"])
-                elif entry_type == "tool_call":
-                    tool_calls += 1
-                elif entry_type == "tool_result":
-                    tool_outputs += 1
-                elif entry_type == "tool":
+
+            # Track first/last timestamp for created/updated
+            ts = entry.get("timestamp")
+            if ts:
+                if first_ts is None:
+                    first_ts = ts
+                last_ts = ts
+            
+            # Handle OpenClaw session format
+            entry_type = entry.get("type", "")
+            
+            if entry_type == "message":
+                message_entries += 1
+                msg = entry.get("message", {})
+                role = msg.get("role", "")
+                if role in ("user", "assistant"):
+                    messages += 1
+                if role == "toolResult":
                     tool_outputs += 1
-                    
-            except json.JSONDecodeError:
-                continue
+                # Extract model from message
+                model = msg.get("model")
+                if model:
+                    models.add(model)
+                    last_model = model
+                # Count tool calls in message content array
+                content = msg.get("content", [])
+                if isinstance(content, list):
+                    for item in content:
+                        if isinstance(item, dict) and item.get("type") == "toolCall":
+                            message_tool_calls += 1
+                # Also check for tool_calls field
+                if msg.get("tool_calls"):
+                    message_tool_calls += len(msg["tool_calls"])
+            elif entry_type == "tool_call":
+                tool_calls += 1
+            elif entry_type == "tool_result":
+                tool_outputs += 1
+            elif entry_type == "tool":
+                tool_outputs += 1
+            elif entry_type == "custom" and entry.get("customType") == "model-snapshot":
+                model_id = entry.get("data", {}).get("modelId") or entry.get("data", {}).get("model")
+                if model_id:
+                    snapshot_models.add(model_id)
+                
+        except json.JSONDecodeError:
+            continue
 
     return {
         "size": size,
         "messages": messages,
-        "tool_calls": tool_calls,
+        "tool_calls": tool_calls + message_tool_calls,
         "tool_outputs": tool_outputs,
-        "entries": entries,
         "models": list(models),
-        "model": list(models)[-1] if models else None,  # Last model = current
+        "model": last_model,  # Most recently used model = current
+        "created": first_ts,
+        "updated": last_ts,
+        "duration": session_duration(first_ts, last_ts),
+        "message_entries": message_entries,
+        "message_tool_calls": message_tool_calls,
+        "snapshot_models": list(snapshot_models),
     }
 
 
-def get_session_timestamps(filepath: Path) -> tuple[Optional[str], Optional[str], Optional[float]]:
-    """Get created, updated timestamps and duration from session file."""
-    if not filepath.exists():
-        return None, None, None
+@contextmanager
+def open_jsonl_lines(filepath: Path, size: Optional[int] = None):
+    """Open a JSONL file and yield an iterator over its raw lines.
+
+    With size, only the file's first size bytes are read, so lines appended
+    after the caller's stat are left for the next scan. Smaller files are
+    read with a single read() and split from memory; larger ones are read
+    line by line through a READ_BUFFER_BYTES buffer, with the kernel told
+    the file will be read sequentially, which widens its readahead.
 
+    Session files are never memory-mapped: OpenClaw may truncate or compact
+    them while we read, which turns an access to a mapping into a SIGBUS
+    that kills the whole server, where a read just comes up short.
+    """
+    with open(filepath, "rb", buffering=READ_BUFFER_BYTES) as f:
+        length = os.fstat(f.fileno()).st_size
+        if size is not None:
+            length = min(length, size)
+        if length < READ_ALL_MAX_BYTES:
+            yield io.BytesIO(f.read(length))
+            return
+        if hasattr(os, "posix_fadvise"):
+            os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        yield _read_lines(f, length)
+
+
+def file_contains(filepath: Path, needle: bytes) -> bool:
+    """Check whether a file contains needle, reading it in large blocks."""
+    overlap = len(needle) - 1
+    with open(filepath, "rb", buffering=0) as f:
+        prev = b""
+        while block := f.read(READ_BUFFER_BYTES):
+            if needle in prev + block:
+                return True
+            prev = block[-overlap:] if overlap else b""
+    return False
+
+
+def _scan_jsonl(filepath: Path, size: Optional[int] = None, entries: Optional[list] = None) -> dict:
+    """Scan a JSONL session file, up to size bytes if given; see _scan_lines."""
+    try:
+        with open_jsonl_lines(filepath, size) as lines:
+            if size is None:
+                size = filepath.stat().st_size
+            return _scan_lines(lines, size, entries)
+    except FileNotFoundError:
+        return _scan_lines([], 0)
+
+
+def analyze_bytes(raw: bytes) -> dict:
+    """Analyze JSONL content already read into memory, including parsed entries."""
     entries = []
-    with open(filepath, "r", encoding="utf-8") as f:
-        for line in f:
-            line = line.strip()
-            if line:
-                try:
-                    entry = json.loads(line)
-                    # Handle OpenClaw format - timestamp can be in different places
-                    ts = entry.get("timestamp")
-                    if ts:
-                        entries.append(ts)
-                except:
-                    continue
+    analysis = _scan_lines(raw.split(b"\n"), len(raw), entries)
+    analysis["entries"] = entries
+    return analysis
+
+
+# Cache of analyze_jsonl_cached results: path -> ((mtime_ns, size),
+# analysis, inode, edge). Keyed by path alone so a changed file replaces its
+# stale entry; inode and edge tell whether the change was only an append.
+_analysis_cache: OrderedDict = OrderedDict()
+_analysis_cache_lock = threading.Lock()
 
-    if not entries:
-        return None, None, None
 
+class MetadataCache:
+    """SQLite store of session file analyses so restarts don't re-parse every file.
+
+    Rows are keyed by file path and hold the same (stamp, analysis, inode,
+    edge) entries as the in-memory cache, so after a restart a grown file
+    still only has its appended lines scanned. Rows are ignored unless
+    CACHE_VERSION matches; bump it whenever _scan_lines changes what it
+    counts.
+    """
+
+    CACHE_VERSION = 2
+    # SQLite integers are signed 64-bit; inodes (NFS, overlayfs) may use all 64 bits
+    INODE_RANGE = 1 << 64
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS session_analysis ("
+            "path TEXT PRIMARY KEY, mtime_ns INTEGER, size INTEGER, inode INTEGER, "
+            "edge BLOB, cache_version INTEGER, analysis TEXT)"
+        )
+        self._conn.commit()
+
+    def get(self, path: str) -> Optional[tuple]:
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT mtime_ns, size, inode, edge, analysis FROM session_analysis "
+                    "WHERE path = ? AND cache_version = ?",
+                    (path, self.CACHE_VERSION),
+                ).fetchone()
+            if row is None:
+                return None
+            mtime_ns, size, inode, edge, analysis = row
+            return (mtime_ns, size), json_loads(analysis), inode % self.INODE_RANGE, edge
+        except Exception as e:
+            # The cache is only an optimization: any failure is a miss
+            logger.debug("Metadata cache read failed for %s: %s", path, e)
+            return None
+
+    def put(self, path: str, entry: tuple):
+        (mtime_ns, size), analysis, inode, edge = entry
+        # Stored as the two's complement signed value; get() maps it back
+        if inode >= self.INODE_RANGE >> 1:
+            inode -= self.INODE_RANGE
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO session_analysis VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (path, mtime_ns, size, inode, edge, self.CACHE_VERSION, json_dumps(analysis).decode("utf-8")),
+                )
+                self._conn.commit()
+        except Exception as e:
+            # A failed write leaves the request served from the fresh analysis
+            logger.debug("Metadata cache write failed for %s: %s", path, e)
+
+    def delete(self, path: str):
+        try:
+            with self._lock:
+                self._conn.execute("DELETE FROM session_analysis WHERE path = ?", (path,))
+                self._conn.commit()
+        except sqlite3.Error as e:
+            logger.debug("Metadata cache delete failed for %s: %s", path, e)
+
+    def delete_missing(self):
+        """Drop rows of session files that no longer exist, e.g. removed by OpenClaw."""
+        try:
+            with self._lock:
+                paths = [path for (path,) in self._conn.execute("SELECT path FROM session_analysis")]
+            gone = [(path,) for path in paths if not os.path.exists(path)]
+            if gone:
+                with self._lock:
+                    self._conn.executemany("DELETE FROM session_analysis WHERE path = ?", gone)
+                    self._conn.commit()
+        except sqlite3.Error as e:
+            logger.debug("Metadata cache cleanup failed: %s", e)
+
+
+def _open_metadata_cache() -> Optional[MetadataCache]:
+    if not ANALYSIS_CACHE_DB:
+        return None
     try:
-        created = entries[0]
-        updated = entries[-1]
-        start = datetime.fromisoformat(created.replace("Z", "+00:00"))
-        end = datetime.fromisoformat(updated.replace("Z", "+00:00"))
-        duration = (end - start).total_seconds() / 60
-        return created, updated, duration
-    except:
-        return entries[0], entries[-1], None
+        Path(ANALYSIS_CACHE_DB).parent.mkdir(parents=True, exist_ok=True)
+        cache = MetadataCache(ANALYSIS_CACHE_DB)
+    except (OSError, sqlite3.Error) as e:
+        logger.warning("Persistent metadata cache disabled (%s): %s", ANALYSIS_CACHE_DB, e)
+        return None
+    cache.delete_missing()
+    return cache
+
+
+metadata_cache = _open_metadata_cache()
+
+
+def forget_analysis(filepath: Path):
+    """Drop the cached analysis of a file that was modified in place or removed."""
+    with _analysis_cache_lock:
+        _analysis_cache.pop(str(filepath), None)
+    if metadata_cache:
+        metadata_cache.delete(str(filepath))
+
+
+def _extend_edge(edge: bytes, data: bytes) -> bytes:
+    """Get the last APPEND_CHECK_BYTES of edge followed by data."""
+    if len(data) >= APPEND_CHECK_BYTES:
+        return data[-APPEND_CHECK_BYTES:]
+    return (edge + data)[-APPEND_CHECK_BYTES:]
+
+
+def _tracking_edge(lines: Iterable[bytes], edge: bytes, out: list) -> Iterator[bytes]:
+    """Yield lines, then set out to [edge extended by them, their total length]."""
+    total = 0
+    for line in lines:
+        total += len(line)
+        edge = _extend_edge(edge, line)
+        yield line
+    out[:] = [edge, total]
+
+
+def _read_lines(f, count: int) -> Iterator[bytes]:
+    """Read lines from f's position until count bytes have been read."""
+    while count > 0:
+        line = f.readline(count)
+        if not line:
+            return
+        count -= len(line)
+        yield line
+
+
+def _scan_file(filepath: Path, size: int) -> tuple[dict, Optional[bytes]]:
+    """Scan a session file's first size bytes.
+
+    Returns the analysis and the edge: the last APPEND_CHECK_BYTES of the
+    bytes scanned, if they were all there and a line ends right at size.
+    """
+    tracked = []
+    try:
+        with open_jsonl_lines(filepath, size) as lines:
+            analysis = _scan_lines(_tracking_edge(lines, b"", tracked), size)
+    except FileNotFoundError:
+        return _scan_lines([], 0), None
+    edge, total = tracked
+    return analysis, edge if total == size and edge.endswith(b"\n") else None
+
+
+def _scan_appended(filepath: Path, st: os.stat_result, cached: tuple) -> Optional[tuple[dict, Optional[bytes]]]:
+    """Analyze only the lines appended since a cached analysis.
+
+    Only bytes up to st.st_size are read, so anything appended after the
+    stat is counted by the next scan, not twice. Returns the merged
+    analysis and the new edge, or None unless the file is the same inode,
+    grew, and still has the cached edge bytes at the old end, i.e. it was
+    appended to rather than rewritten.
+    """
+    (_, old_size), prev, ino, edge = cached
+    if edge is None or ino != st.st_ino or st.st_size <= old_size:
+        return None
+    tracked = []
+    try:
+        with open(filepath, "rb") as f:
+            f.seek(old_size - len(edge))
+            if f.read(len(edge)) != edge:
+                return None
+            count = st.st_size - old_size
+            tail = _scan_lines(_tracking_edge(_read_lines(f, count), edge, tracked), st.st_size)
+    except FileNotFoundError:
+        return None
+    new_edge, total = tracked
+    if total != count:
+        # Truncated while being read
+        return None
+
+    created = prev["created"] or tail["created"]
+    updated = tail["updated"] or prev["updated"]
+    merged = {
+        key: prev[key] + tail[key]
+        for key in ("messages", "tool_calls", "tool_outputs", "message_entries", "message_tool_calls")
+    }
+    merged.update(
+        size=st.st_size,
+        models=list(set(prev["models"]) | set(tail["models"])),
+        model=tail["model"] or prev["model"],
+        created=created,
+        updated=updated,
+        duration=session_duration(created, updated),
+        snapshot_models=list(set(prev["snapshot_models"]) | set(tail["snapshot_models"])),
+    )
+    return merged, new_edge if new_edge.endswith(b"\n") else None
+
+
+def analyze_jsonl_cached(filepath: Path, st: Optional[os.stat_result] = None) -> dict:
+    """Analyze a JSONL session file, reusing the last result if the file is unchanged.
+
+    A file that was only appended to since its cached analysis has just the
+    new lines scanned. Pass st when the caller already has the file's stat,
+    e.g. from os.scandir.
+    """
+    if st is None:
+        try:
+            st = filepath.stat()
+        except FileNotFoundError:
+            return _scan_lines([], 0)
+
+    path, stamp = str(filepath), (st.st_mtime_ns, st.st_size)
+    with _analysis_cache_lock:
+        cached = _analysis_cache.get(path)
+        if cached is not None and cached[0] == stamp:
+            _analysis_cache.move_to_end(path)
+            return cached[1]
+    if cached is None and metadata_cache:
+        cached = metadata_cache.get(path)
+
+    if cached is not None and cached[0] == stamp:
+        entry = cached
+    else:
+        scanned = _scan_appended(filepath, st, cached) if cached is not None else None
+        if scanned is None:
+            scanned = _scan_file(filepath, st.st_size)
+        analysis, edge = scanned
+        entry = (stamp, analysis, st.st_ino, edge)
+        if metadata_cache:
+            metadata_cache.put(path, entry)
+
+    with _analysis_cache_lock:
+        _analysis_cache[path] = entry
+        _analysis_cache.move_to_end(path)
+        while len(_analysis_cache) > ANALYSIS_CACHE_SIZE:
+            _analysis_cache.popitem(last=False)
+    return entry[1]
+
+
+def stat_session_file(filepath: Path) -> os.stat_result:
+    """Stat a session file, raising 404 if it doesn't exist."""
+    try:
+        return filepath.stat()
+    except (FileNotFoundError, NotADirectoryError):
+        raise HTTPException(status_code=404, detail="Session not found")
 
 
 @app.get("/config")
@@ -332,10 +1029,8 @@ def list_agents(request: Request, api_key: str = Depends(verify_api_key)):
 
 @app.post("/restart")
 @limiter.limit("5/minute")
-def restart_openclaw(request: Request, req: RestartRequest, api_key: str = Depends(require_write_access)):
+async def restart_openclaw(request: Request, req: RestartRequest, api_key: str = Depends(require_write_access)):
     """Trigger OpenClaw gateway restart."""
-    import shutil
-
     log_action("restart", "system", user=api_key, details={"delay_ms": req.delay_ms})
 
     # Check if openclaw is available
@@ -352,122 +1047,245 @@ def restart_openclaw(request: Request, req: RestartRequest, api_key: str = Depen
             "message": "Restart command received. When running in container, restart must be performed on host."
         }
 
-    import subprocess
     try:
-        # Trigger gateway restart using openclaw CLI
-        result = subprocess.run(
-            [openclaw_path, "gateway", "restart", "--delay", str(req.delay_ms)],
-            capture_output=True,
-            text=True,
-            timeout=10
+        # Trigger gateway restart using openclaw CLI, without blocking a worker thread
+        proc = await asyncio.create_subprocess_exec(
+            openclaw_path, "gateway", "restart", "--delay", str(req.delay_ms),
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
         )
+        try:
+            stdout, _ = await asyncio.wait_for(proc.communicate(), timeout=10)
+        except asyncio.TimeoutError:
+            # The restart command may not return if the process is killed
+            try:
+                proc.kill()
+            except ProcessLookupError:
+                pass
+            # Reap it so it doesn't linger as a zombie with an open transport
+            await proc.wait()
+            return {
+                "restarted": True,
+                "delay_ms": req.delay_ms,
+                "note": req.note,
+                "status": "restart initiated"
+            }
+        output = stdout.decode("utf-8", errors="replace").strip()
         return {
             "restarted": True,
             "delay_ms": req.delay_ms,
             "note": req.note,
-            "output": result.stdout.strip() if result.stdout else None
-        }
-    except subprocess.TimeoutExpired:
-        # The restart command may not return if the process is killed
-        return {
-            "restarted": True,
-            "delay_ms": req.delay_ms,
-            "note": req.note,
-            "status": "restart initiated"
+            "output": output or None
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Restart failed: {str(e)}")
 
 
-@app.get("/sessions", response_model=SessionList)
+def stat_if_exists(dir_entry) -> Optional[os.stat_result]:
+    """Stat a session file found by an earlier directory scan.
+
+    dir_entry is an os.DirEntry (or anything else with a stat() method,
+    like a Path), or None. Returns None if there is no entry or the file
+    has been removed since, e.g. by a delete or an OpenClaw compaction.
+    """
+    if dir_entry is None:
+        return None
+    try:
+        return dir_entry.stat()
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+
+
+def build_session_info(
+    agent: str, sess: dict, filepath: Path, st: Optional[os.stat_result], now: Optional[float] = None
+) -> dict:
+    """Build the list view entry for one session.
+
+    st is the session file's stat, or None if the file does not exist.
+    now is the POSIX time staleness is judged against, so a listing can use
+    one instant for all its sessions.
+    """
+    session_id = sess.get("sessionId", "unknown")
+    if st is not None:
+        analysis = analyze_jsonl_cached(filepath, st)
+    else:
+        analysis = _scan_lines([], 0)
+    created, updated, duration = analysis["created"], analysis["updated"], analysis["duration"]
+
+    # Determine if stale (inactive for >24h)
+    is_stale = is_stale_timestamp(updated, now)
+    status = "stale" if is_stale else "active"
+
+    # A plain dict with SessionInfo's fields: the list view builds one per
+    # session, so no model is constructed and dumped again
+    return dict(
+        id=session_id,
+        agent=agent,
+        label=sess.get("label", session_id[:8]),
+        path=str(filepath),
+        size=analysis["size"],
+        messages=analysis["messages"],
+        tool_calls=analysis["tool_calls"],
+        tool_outputs=analysis["tool_outputs"],
+        created=created,
+        updated=updated,
+        duration_minutes=duration,
+        model=analysis.get("model"),
+        models=analysis.get("models", []),
+        is_stale=is_stale,
+        status=status,
+    )
+
+
+def _recency(session: dict) -> float:
+    """Sort key for list entries: POSIX time of the last activity, unknown last."""
+    updated_ts = parse_iso_timestamp(session["updated"])
+    return updated_ts if updated_ts is not None else float("-inf")
+
+
+# Shared by all list and trash requests so worker threads aren't started per request.
+# Jobs never submit to it themselves, so concurrent requests can't deadlock.
+session_executor = ThreadPoolExecutor(max_workers=LIST_SESSIONS_WORKERS, thread_name_prefix="session-scan")
+
+
+def _agent_session_tasks(agent: str) -> list[tuple]:
+    """Get build_session_info arguments for each session of an agent."""
+    sessions_dir = AGENTS_DIR / agent / "sessions"
+    # One directory read tells which session files exist
+    try:
+        with os.scandir(sessions_dir) as it:
+            dir_entries = {e.name: e for e in it if e.name.endswith(".jsonl")}
+    except (FileNotFoundError, NotADirectoryError):
+        dir_entries = {}
+    return [
+        (agent, sess, sessions_dir / filename, dir_entries.get(filename))
+        for sess, filename in load_sessions_index(agent).session_files
+    ]
+
+
+# Hot endpoints return their JSON response directly: models are built without
+# validation and dumped by pydantic-core, skipping both response validation
+# and FastAPI's Python-level jsonable_encoder walk. The models stay the
+# documented response schemas.
+@app.get("/sessions", response_model=None, responses={200: {"model": SessionList}})
 @limiter.limit("60/minute")
 def list_sessions(request: Request, agent: Optional[str] = None, api_key: str = Depends(verify_api_key)):
     """List sessions, optionally filtered by agent."""
-    sessions = []
-    total_size = 0
-
     # Sanitize agent parameter if provided
     if agent:
         agent = sanitize_path_component(agent, "agent")
 
-    agents_to_check = [agent] if agent else get_agents()
+    agents = get_agents()
+    agents_to_check = [agent] if agent else agents
 
-    for ag in agents_to_check:
-        agent_sessions = get_agent_sessions(ag)
-        for sess in agent_sessions:
-            session_id = sess.get("sessionId", "unknown")
-            sessions_dir = AGENTS_DIR / ag / "sessions"
-            filepath = sessions_dir / f"{session_id}.jsonl"
-            
-            analysis = analyze_jsonl(filepath)
-            created, updated, duration = get_session_timestamps(filepath)
+    # Agents are listed and their session files analyzed in parallel;
+    # file reads and stats release the GIL
+    tasks = [task for agent_tasks in session_executor.map(_agent_session_tasks, agents_to_check) for task in agent_tasks]
+    now = time.time()
+    # Files are statted in the workers; one removed since the scan is listed as missing
+    sessions = list(session_executor.map(
+        lambda task: build_session_info(*task[:3], stat_if_exists(task[3]), now=now), tasks
+    ))
+    total_size = sum(s["size"] for s in sessions)
 
-            # Determine if stale (inactive for >24h)
-            is_stale = False
-            status = "active"
-            if updated:
-                try:
-                    updated_dt = datetime.fromisoformat(updated.replace("Z", "+00:00"))
-                    now = datetime.now(timezone.utc)
-                    if (now - updated_dt) > timedelta(hours=24):
-                        is_stale = True
-                        status = "stale"
-                except:
-                    pass
+    return etag_json_response(request, {
+        "sessions": sorted(sessions, key=_recency, reverse=True),
+        "agents": agents,
+        "total_size": total_size,
+    })
 
-            sessions.append(SessionInfo(
-                id=session_id,
-                agent=ag,
-                label=sess.get("label", session_id[:8]),
-                path=str(filepath),
-                size=analysis["size"],
-                messages=analysis["messages"],
-                tool_calls=analysis["tool_calls"],
-                tool_outputs=analysis["tool_outputs"],
-                created=created,
-                updated=updated,
-                duration_minutes=duration,
-                model=analysis.get("model"),
-                models=analysis.get("models", []),
-                is_stale=is_stale,
-                status=status,
-            ))
-            total_size += analysis["size"]
-
-    return SessionList(
-        sessions=sorted(sessions, key=lambda s: s.updated or "", reverse=True),
-        agents=get_agents(),
-        total_size=total_size,
-    )
+
+@app.post("/sessions/analyze", response_model=None)
+@limiter.limit("60/minute")
+def analyze_sessions(request: Request, req: AnalyzeSessionsRequest, api_key: str = Depends(verify_api_key)):
+    """Get list view entries for specific sessions in one request.
+
+    Sessions are returned in request order; pairs with neither a session
+    file nor a sessions.json entry are reported under missing.
+    """
+    if len(req.ids) > ANALYZE_BATCH_MAX_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {ANALYZE_BATCH_MAX_IDS} sessions per request")
+
+    tasks = []
+    for agent, session_id in req.ids:
+        agent = sanitize_path_component(agent, "agent")
+        session_id = sanitize_path_component(session_id, "session_id")
+        filepath = AGENTS_DIR / agent / "sessions" / f"{session_id}.jsonl"
+        tasks.append((agent, session_id, load_sessions_index(agent).by_id.get(session_id), filepath))
+
+    now = time.time()
+
+    def session_info(task: tuple) -> Optional[dict]:
+        agent, session_id, sess, filepath = task
+        # Stat in the worker; a file removed meanwhile makes just this pair
+        # missing rather than failing the batch
+        st = stat_if_exists(filepath)
+        if st is not None and not stat.S_ISREG(st.st_mode):
+            st = None
+        if sess is None and st is None:
+            return None
+        return build_session_info(agent, sess or {"sessionId": session_id}, filepath, st, now=now)
+
+    sessions = []
+    missing = []
+    for (agent, session_id, _, _), info in zip(tasks, session_executor.map(session_info, tasks)):
+        if info is None:
+            missing.append([agent, session_id])
+        else:
+            sessions.append(info)
+
+    # No ETag: conditional 304s are only defined for GET and HEAD
+    return FastJSONResponse({
+        "sessions": sessions,
+        "missing": missing,
+        "total_size": sum(s["size"] for s in sessions),
+    })
+
+
+HEARTBEAT_INDICATORS = [
+    "heartbeat",
+    "HEARTBEAT_OK",
+    "checking token",
+    "context compacted",
+    "compacted (",
+    "tokens:",
+    "token count",
+    "system: [",
+    "[system]",
+    "you've been rate limited",
+    "rate limit",
+    "compacting context",
+    "continue on your open tasks",
+]
+# All indicators in one case-insensitive pattern: a single scan per message
+HEARTBEAT_RE = re.compile("|".join(re.escape(ind) for ind in HEARTBEAT_INDICATORS), re.IGNORECASE)
 
 
 def is_heartbeat_message(text: str) -> bool:
     """Check if message is a heartbeat check or automated system message."""
     if not text:
         return True
-    heartbeat_indicators = [
-        "heartbeat",
-        "HEARTBEAT_OK",
-        "checking token",
-        "context compacted",
-        "compacted (",
-        "tokens:",
-        "token count",
-        "system: [",
-        "[system]",
-        "you've been rate limited",
-        "rate limit",
-        "compacting context",
-        "continue on your open tasks",
-    ]
-    text_lower = text.lower()
-    return any(ind in text_lower for ind in heartbeat_indicators)
+    return HEARTBEAT_RE.search(text) is not None
+
+# Summary keyword checks, case-insensitive substring matches like the
+# original lowercased `kw in text` tests
+ACTION_KEYWORDS_RE = re.compile(
+    "implement|build|create|fix|add|update|deploy|configure|refactor|integrate|optimize", re.IGNORECASE
+)
+FILE_KEYWORDS_RE = re.compile("create|write|edit|modify|fix|build", re.IGNORECASE)
+PATH_WORD_RE = re.compile(r"\S*/\S*")  # Whitespace-delimited words containing a '/'
+FILE_EXTENSION_RE = re.compile(r"\.(?:py|js|ts|html|css|json|md|yml|yaml|sh|txt)")
+NONBLANK_LINE_RE = re.compile(r"\S[^\n]*")  # A non-blank line, from its first non-whitespace character
+COMMIT_RE = re.compile("commit", re.IGNORECASE)
+GIT_CHANGE_RE = re.compile("created|modified|deleted")
+
 
-def generate_session_summary(entries: list[dict]) -> dict:
+def generate_session_summary(entries: Iterable[dict]) -> dict:
     """Generate an intelligent summary of a session before deletion.
     
     Excludes heartbeat checks and automated system messages.
     Focuses on user interaction, thinking, and meaningful content.
+    entries is consumed once, so it can be a generator streaming a file.
     """
     summary = {
         "session_type": "chat",
@@ -490,7 +1308,9 @@ def generate_session_summary(entries: list[dict]) -> dict:
     
     first_timestamp = None
     last_timestamp = None
-    seen_topics = set()
+    # Hashes of lines already used; the lines themselves are only kept
+    # while their output list is below its limit
+    seen_hashes: set[int] = set()
     
     for entry in entries:
         entry_type = entry.get("type", "")
@@ -541,7 +1361,8 @@ def generate_session_summary(entries: list[dict]) -> dict:
                 if isinstance(content, list):
                     has_meaningful_content = False
                     for item in content:
-                        if item.get("type") == "thinking":
+                        item_type = item.get("type")
+                        if item_type == "thinking":
                             thinking = item.get("thinking", "")
                             # Skip heartbeat-related thinking
                             if is_heartbeat_message(thinking):
@@ -549,29 +1370,32 @@ def generate_session_summary(entries: list[dict]) -> dict:
                             if len(thinking) > 30:
                                 has_meaningful_content = True
                                 # Extract key insights from thinking
-                                lines = [l.strip() for l in thinking.split('\n') if l.strip()]
-                                for line in lines[:3]:  # First 3 non-empty lines
+                                # First 3 non-empty lines, without splitting the rest
+                                for match in itertools.islice(NONBLANK_LINE_RE.finditer(thinking), 3):
+                                    line = match.group(0).strip()
                                     if len(line) > 20 and len(line) < 200:
-                                        if line not in seen_topics:
-                                            seen_topics.add(line)
-                                            summary["thinking_insights"].append(line)
+                                        h = hash(line)
+                                        if h not in seen_hashes:
+                                            seen_hashes.add(h)
+                                            if len(summary["thinking_insights"]) < 5:
+                                                summary["thinking_insights"].append(line)
                         
-                        elif item.get("type") == "text":
+                        elif item_type == "text":
                             text = item.get("text", "")
                             if is_heartbeat_message(text):
                                 continue
                             has_meaningful_content = True
                             
                             # Look for task/action indicators
-                            action_keywords = ["implement", "build", "create", "fix", "add", "update", 
-                                            "deploy", "configure", "refactor", "integrate", "optimize"]
-                            if any(kw in text.lower() for kw in action_keywords):
+                            if ACTION_KEYWORDS_RE.search(text):
                                 # Extract first sentence as action
-                                first_sentence = text.split('.')[0][:120]
+                                first_sentence = text.partition('.')[0][:120]
                                 if len(first_sentence) > 20:
-                                    if first_sentence not in seen_topics:
-                                        seen_topics.add(first_sentence)
-                                        summary["key_actions"].append(first_sentence)
+                                    h = hash(first_sentence)
+                                    if h not in seen_hashes:
+                                        seen_hashes.add(h)
+                                        if len(summary["key_actions"]) < 5:
+                                            summary["key_actions"].append(first_sentence)
                 
                 if has_meaningful_content:
                     summary["meaningful_messages"] += 1
@@ -580,7 +1404,8 @@ def generate_session_summary(entries: list[dict]) -> dict:
                 if msg.get("errorMessage") or msg.get("stopReason") == "error":
                     error_msg = msg.get("errorMessage", "Unknown error")
                     if not is_heartbeat_message(error_msg):
-                        summary["errors"].append(error_msg[:200])
+                        if len(summary["errors"]) < 3:
+                            summary["errors"].append(error_msg[:200])
             
             elif role == "user":
                 summary["user_messages"] += 1
@@ -596,19 +1421,19 @@ def generate_session_summary(entries: list[dict]) -> dict:
                             
                             # Capture user requests (first sentence)
                             if len(text) > 10 and len(text) < 300:
-                                first_sentence = text.split('.')[0][:150]
-                                if first_sentence not in seen_topics:
-                                    seen_topics.add(first_sentence)
-                                    summary["user_requests"].append(first_sentence)
+                                first_sentence = text.partition('.')[0][:150]
+                                h = hash(first_sentence)
+                                if h not in seen_hashes:
+                                    seen_hashes.add(h)
+                                    if len(summary["user_requests"]) < 5:
+                                        summary["user_requests"].append(first_sentence)
                             
                             # Check for file operations
-                            file_keywords = ["create", "write", "edit", "modify", "fix", "build"]
-                            if any(kw in text.lower() for kw in file_keywords):
-                                words = text.split()
-                                for word in words:
-                                    if '.' in word and '/' in word:
-                                        if any(ext in word for ext in ['.py', '.js', '.ts', '.html', '.css', '.json', '.md', '.yml', '.yaml', '.sh', '.txt']):
-                                            summary["files_created"].add(word.strip('.,;:!?()[]{}'))
+                            if FILE_KEYWORDS_RE.search(text):
+                                for match in PATH_WORD_RE.finditer(text):
+                                    word = match.group(0)
+                                    if FILE_EXTENSION_RE.search(word):
+                                        summary["files_created"].add(word.strip('.,;:!?()[]{}'))
                             
         # Track tool results for git/file operations
         elif entry_type == "tool_result":
@@ -617,25 +1442,19 @@ def generate_session_summary(entries: list[dict]) -> dict:
                 for item in content:
                     if item.get("type") == "text":
                         text = item.get("text", "")
-                        if "commit" in text.lower() and any(kw in text for kw in ["created", "modified", "deleted"]):
+                        if COMMIT_RE.search(text) and GIT_CHANGE_RE.search(text):
                             summary["has_git_commits"] = True
     
     # Calculate duration
-    if first_timestamp and last_timestamp:
-        try:
-            from datetime import datetime, timezone
-            start = datetime.fromisoformat(first_timestamp.replace('Z', '+00:00'))
-            end = datetime.fromisoformat(last_timestamp.replace('Z', '+00:00'))
-            duration_mins = (end - start).total_seconds() / 60
-            summary["duration_estimate"] = round(duration_mins, 1)
-        except:
-            pass
+    duration_mins = session_duration(first_timestamp, last_timestamp)
+    if duration_mins is not None:
+        summary["duration_estimate"] = round(duration_mins, 1)
     
     # Convert sets to lists for JSON
-    summary["tools_used"] = sorted(list(summary["tools_used"]))[:15]
-    summary["models_used"] = sorted(list(summary["models_used"]))
-    summary["files_created"] = sorted(list(summary["files_created"]))[:8]
-    summary["files_modified"] = sorted(list(summary["files_modified"]))[:8]
+    summary["tools_used"] = sorted(summary["tools_used"])[:15]
+    summary["models_used"] = sorted(summary["models_used"])
+    summary["files_created"] = sorted(summary["files_created"])[:8]
+    summary["files_modified"] = sorted(summary["files_modified"])[:8]
     
     # Limit arrays
     summary["thinking_insights"] = summary["thinking_insights"][:5]
@@ -662,21 +1481,25 @@ def get_session_summary(request: Request, agent: str, session_id: str, api_key:
     session_id = sanitize_path_component(session_id, "session_id")
 
     filepath = AGENTS_DIR / agent / "sessions" / f"{session_id}.jsonl"
-    if not filepath.exists():
-        raise HTTPException(status_code=404, detail="Session not found")
-    
-    # Read all entries
-    entries = []
-    with open(filepath, "r", encoding="utf-8") as f:
-        for line in f:
+
+    def stream_entries(lines):
+        for line in lines:
             line = line.strip()
             if line:
+                # Parse outside the yield, so errors raised by the consumer
+                # (and GeneratorExit on close) aren't swallowed here
                 try:
-                    entries.append(json.loads(line))
-                except:
+                    entry = json_loads(line)
+                except ValueError:
                     continue
-    
-    summary = generate_session_summary(entries)
+                yield entry
+
+    # Entries are parsed as the summary consumes them, never all held at once
+    try:
+        with open_jsonl_lines(filepath) as lines:
+            summary = generate_session_summary(stream_entries(lines))
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Session not found")
     
     return {
         "session_id": session_id,
@@ -686,89 +1509,74 @@ def get_session_summary(request: Request, agent: str, session_id: str, api_key:
     }
 
 
-@app.get("/sessions/{agent}/{session_id}", response_model=SessionDetail)
+@app.get("/sessions/{agent}/{session_id}", response_model=None, responses={200: {"model": SessionDetail}})
 @limiter.limit("60/minute")
-def get_session(request: Request, agent: str, session_id: str, api_key: str = Depends(verify_api_key)):
-    """Get full session details."""
+def get_session(
+    request: Request,
+    agent: str,
+    session_id: str,
+    include_raw: bool = False,
+    include_entries: bool = True,
+    api_key: str = Depends(verify_api_key),
+):
+    """Get full session details.
+
+    The raw JSONL is only embedded when include_raw is set, and only up to
+    RAW_CONTENT_MAX_BYTES; clients should prefer GET
+    /sessions/{agent}/{session_id}/raw. With include_entries=false
+    the parsed entries are left out and the counts come from the analysis
+    cache; page through entries with GET /sessions/{agent}/{session_id}/entries.
+    """
     agent = sanitize_path_component(agent, "agent")
     session_id = sanitize_path_component(session_id, "session_id")
 
     filepath = AGENTS_DIR / agent / "sessions" / f"{session_id}.jsonl"
-    if not filepath.exists():
-        raise HTTPException(status_code=404, detail="Session not found")
+    st = stat_session_file(filepath)
 
-    agent_sessions = get_agent_sessions(agent)
-    print(f"DEBUG: Found {len(agent_sessions)} sessions for agent {agent}")
+    sessions_index = load_sessions_index(agent)
     label = session_id
-    session_meta = None
-    for sess in agent_sessions:
-        sid = sess.get("sessionId")
-        print(f"DEBUG: Checking session {sid}")
-        if sid == session_id:
-            label = sess.get("label", session_id)
-            session_meta = sess
-            print(f"DEBUG: Found matching session! Meta keys: {sess.keys()}")
-            break
-    if not session_meta:
-        print(f"DEBUG: No session_meta found for {session_id}")
-
-    analysis = analyze_jsonl(filepath)
-
-    raw_content = ""
-    if filepath.exists():
-        with open(filepath, "r", encoding="utf-8") as f:
-            raw_content = f.read()
+    session_meta = sessions_index.by_id.get(session_id)
+    if session_meta:
+        label = session_meta.get("label", session_id)
+    else:
+        logger.debug("No session metadata found for %s/%s", agent, session_id)
+
+    # Read the file once: raw content and analysis come from the same bytes
+    raw_content = None
+    if include_raw:
+        if st.st_size > RAW_CONTENT_MAX_BYTES:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Session too large to embed; use GET /sessions/{agent}/{session_id}/raw",
+            )
+        raw_bytes = filepath.read_bytes()
+        raw_content = raw_bytes.decode("utf-8", errors="replace")
+        analysis = analyze_bytes(raw_bytes) if include_entries else analyze_jsonl_cached(filepath, st)
+    elif include_entries:
+        entries = []
+        analysis = _scan_jsonl(filepath, entries=entries)
+        analysis["entries"] = entries
+    else:
+        analysis = analyze_jsonl_cached(filepath, st)
 
     # Get timestamps and stale status
-    created, updated, duration_mins = get_session_timestamps(filepath)
-    is_stale = False
-    if updated:
-        try:
-            from datetime import datetime, timezone, timedelta
-            updated_dt = datetime.fromisoformat(updated.replace('Z', '+00:00'))
-            is_stale = (datetime.now(timezone.utc) - updated_dt) > timedelta(hours=24)
-        except:
-            pass
+    created, updated, duration_mins = analysis["created"], analysis["updated"], analysis["duration"]
+    is_stale = is_stale_timestamp(updated)
 
     # Find parent/children relationships
     parent_id = session_meta.get("parent_session_id") if session_meta else None
-    children = []
-    if agent_sessions:
-        for sess in agent_sessions:
-            if sess.get("parent_session_id") == session_id:
-                children.append({
-                    "sessionId": sess.get("sessionId"),
-                    "label": sess.get("label", sess.get("sessionId", "")[:8])
-                })
-
-    # Extract models from entries
-    models = set()
-    for entry in analysis.get("entries", []):
-        if entry.get("type") == "custom" and entry.get("customType") == "model-snapshot":
-            model_id = entry.get("data", {}).get("modelId") or entry.get("data", {}).get("model")
-            if model_id:
-                models.add(model_id)
-        elif entry.get("type") == "message":
-            msg_model = entry.get("message", {}).get("model")
-            if msg_model:
-                models.add(msg_model)
-
-    # Count messages and tool calls from entries
-    messages = 0
-    tool_calls = 0
-    for entry in analysis.get("entries", []):
-        if entry.get("type") == "message":
-            messages += 1
-            msg = entry.get("message", {})
-            # Check for tool_calls field (OpenAI format)
-            if msg.get("tool_calls"):
-                tool_calls += len(msg.get("tool_calls", []))
-            # Check for toolCall in content array (OpenClaw format)
-            content = msg.get("content", [])
-            if isinstance(content, list):
-                for item in content:
-                    if isinstance(item, dict) and item.get("type") == "toolCall":
-                        tool_calls += 1
+    children = [
+        {
+            "sessionId": sess.get("sessionId"),
+            "label": sess.get("label", sess.get("sessionId", "")[:8])
+        }
+        for sess in sessions_index.children.get(session_id, [])
+    ]
+
+    # Models from model snapshots and messages; counts over all message entries
+    models = set(analysis["models"]) | set(analysis["snapshot_models"])
+    messages = analysis["message_entries"]
+    tool_calls = analysis["message_tool_calls"]
 
     # Extract fields from sessions.json with correct field names
     channel = session_meta.get("lastChannel") if session_meta else None
@@ -777,7 +1585,7 @@ def get_session(request: Request, agent: str, session_id: str, api_key: str = De
     
     system_prompt_report = session_meta.get("systemPromptReport") if session_meta else None
     if isinstance(system_prompt_report, dict):
-        system_prompt_report = json.dumps(system_prompt_report, indent=2)
+        system_prompt_report = json_dumps(system_prompt_report, indent=True).decode("utf-8")
     
     resolved_skills = []
     if session_meta and session_meta.get("skillsSnapshot"):
@@ -792,16 +1600,16 @@ def get_session(request: Request, agent: str, session_id: str, api_key: str = De
     input_tokens = session_meta.get("inputTokens") if session_meta else None
     output_tokens = session_meta.get("outputTokens") if session_meta else None
     
-    print(f"DEBUG: Extracted metadata - channel={channel}, tokens={tokens}, skills_count={len(resolved_skills)}")
+    logger.debug("Extracted metadata - channel=%s, tokens=%s, skills_count=%d", channel, tokens, len(resolved_skills))
     
-    return SessionDetail(
+    detail = SessionDetail.model_construct(
         id=session_id,
         agent=agent,
         label=label,
         path=str(filepath),
         size=analysis["size"],
         raw_content=raw_content,
-        entries=analysis["entries"],
+        entries=analysis.get("entries", []),
         messages=messages,
         tool_calls=tool_calls,
         duration_minutes=duration_mins,
@@ -819,6 +1627,66 @@ def get_session(request: Request, agent: str, session_id: str, api_key: str = De
         inputTokens=input_tokens,
         outputTokens=output_tokens,
     )
+    return etag_json_response(request, detail.model_dump())
+
+
+@app.get("/sessions/{agent}/{session_id}/entries")
+@limiter.limit("60/minute")
+def get_session_entries(
+    request: Request,
+    agent: str,
+    session_id: str,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    api_key: str = Depends(verify_api_key),
+):
+    """Get a page of parsed session entries.
+
+    Indices match those used by PUT /sessions/{agent}/{session_id}/entries/{index};
+    only the requested lines are parsed.
+    """
+    agent = sanitize_path_component(agent, "agent")
+    session_id = sanitize_path_component(session_id, "session_id")
+
+    filepath = AGENTS_DIR / agent / "sessions" / f"{session_id}.jsonl"
+
+    try:
+        with open_jsonl_lines(filepath) as raw_lines:
+            lines = (line for line in (raw.strip() for raw in raw_lines) if line)
+            # Read one line past the page to tell whether more entries follow
+            page = list(itertools.islice(lines, offset, offset + limit + 1))
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Session not found")
+
+    entries = []
+    for line in page[:limit]:
+        try:
+            entries.append(json_loads(line))
+        except ValueError:
+            entries.append({"_raw": line.decode("utf-8", errors="replace")})
+
+    # Pages hold whole entries, so skip the jsonable_encoder walk too
+    return etag_json_response(request, {
+        "entries": entries,
+        "offset": offset,
+        "limit": limit,
+        "has_more": len(page) > limit,
+    })
+
+
+@app.get("/sessions/{agent}/{session_id}/raw")
+@limiter.limit("60/minute")
+def get_session_raw(request: Request, agent: str, session_id: str, api_key: str = Depends(verify_api_key)):
+    """Get the raw session JSONL file."""
+    agent = sanitize_path_component(agent, "agent")
+    session_id = sanitize_path_component(session_id, "session_id")
+
+    filepath = AGENTS_DIR / agent / "sessions" / f"{session_id}.jsonl"
+    st = stat_session_file(filepath)
+
+    # Served straight from disk (sendfile where available), never decoded;
+    # FileResponse answers Range requests with 206 partial content
+    return FileResponse(filepath, media_type="application/x-ndjson", stat_result=st)
 
 
 @app.delete("/sessions/{agent}/{session_id}")
@@ -829,66 +1697,138 @@ def delete_session(request: Request, agent: str, session_id: str, api_key: str =
     session_id = sanitize_path_component(session_id, "session_id")
 
     filepath = AGENTS_DIR / agent / "sessions" / f"{session_id}.jsonl"
-    sessions_file = AGENTS_DIR / agent / "sessions" / "sessions.json"
 
     log_action("delete", agent, session_id, user=api_key)
 
     # Create trash directory if needed
     TRASH_DIR.mkdir(parents=True, exist_ok=True)
 
-    # Move file to trash (with timestamp to avoid collisions)
-    if filepath.exists():
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        trash_path = TRASH_DIR / f"{agent}_{session_id}_{timestamp}.jsonl"
-        shutil.move(str(filepath), str(trash_path))
-        
+    # One timestamp per request names the trashed files (avoids collisions
+    # with earlier deletes) and dates their retention
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    trashed_at = datetime.now(timezone.utc)
+    retention = {
+        "trashed_at": trashed_at.isoformat(),
+        "expires_at": (trashed_at + timedelta(days=TRASH_RETENTION_DAYS)).isoformat(),
+    }
+
+    def move_to_trash(sid: str, path: Path, **extra):
+        trash_path = TRASH_DIR / f"{agent}_{sid}_{timestamp}.jsonl"
+        try:
+            # A rename when the trash is on the same filesystem, which it
+            # is by default (both under OPENCLAW_ROOT)
+            os.replace(path, trash_path)
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+            shutil.move(str(path), str(trash_path))
+        forget_analysis(path)
         # Also write metadata file for retention tracking
         metadata = {
             "original_agent": agent,
-            "original_session_id": session_id,
-            "original_path": str(filepath),
-            "trashed_at": datetime.now(timezone.utc).isoformat(),
-            "expires_at": (datetime.now(timezone.utc) + timedelta(days=TRASH_RETENTION_DAYS)).isoformat(),
+            "original_session_id": sid,
+            "original_path": str(path),
+            **retention,
+            **extra,
         }
-        metadata_path = TRASH_DIR / f"{agent}_{session_id}_{timestamp}.meta.json"
-        with open(metadata_path, "w") as f:
-            json.dump(metadata, f)
+        meta_name = f"{agent}_{sid}_{timestamp}.meta.json"
+        with open(TRASH_DIR / meta_name, "wb") as f:
+            f.write(json_dumps(metadata))
+        remember_trash_meta(meta_name, metadata)
+
+    # Move file to trash
+    try:
+        move_to_trash(session_id, filepath)
+    except FileNotFoundError:
+        pass
 
     # Also delete child sessions (sessions that have this as parent)
-    if sessions_file.exists():
-        try:
-            with open(sessions_file, "r") as f:
-                data = json.load(f)
-            # Find entries with this session as parent
-            keys_to_remove = [k for k, v in data.items() if v.get("sessionId") == session_id or v.get("parent_session_id") == session_id]
-            for key in keys_to_remove:
-                child_sid = data[key].get("sessionId")
-                if child_sid:
-                    child_path = AGENTS_DIR / agent / "sessions" / f"{child_sid}.jsonl"
-                    if child_path.exists():
-                        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                        trash_path = TRASH_DIR / f"{agent}_{child_sid}_{timestamp}.jsonl"
-                        shutil.move(str(child_path), str(trash_path))
-                        metadata = {
-                            "original_agent": agent,
-                            "original_session_id": child_sid,
-                            "original_path": str(child_path),
-                            "trashed_at": datetime.now(timezone.utc).isoformat(),
-                            "expires_at": (datetime.now(timezone.utc) + timedelta(days=TRASH_RETENTION_DAYS)).isoformat(),
-                            "parent_session_id": session_id,
-                        }
-                        metadata_path = TRASH_DIR / f"{agent}_{child_sid}_{timestamp}.meta.json"
-                        with open(metadata_path, "w") as f:
-                            json.dump(metadata, f)
-                del data[key]
-            with open(sessions_file, "w") as f:
-                json.dump(data, f, indent=2)
-        except (json.JSONDecodeError, IOError):
-            pass
+    def remove_session_and_children(data: dict, index: SessionsIndex) -> bool:
+        # Entries of this session and those with it as parent
+        keys_to_remove = list(dict.fromkeys(
+            index.keys_by_id.get(session_id, []) + [sess["_key"] for sess in index.children.get(session_id, [])]
+        ))
+        for key in keys_to_remove:
+            child_sid = data[key].get("sessionId")
+            if child_sid:
+                child_path = AGENTS_DIR / agent / "sessions" / f"{child_sid}.jsonl"
+                try:
+                    move_to_trash(child_sid, child_path, parent_session_id=session_id)
+                except FileNotFoundError:
+                    pass
+            del data[key]
+        return bool(keys_to_remove)
 
+    try:
+        update_agent_sessions(agent, remove_session_and_children)
+    except IOError:
+        pass
+
+    invalidate_trash_index()
     return {"deleted": True, "id": session_id, "moved_to_trash": True}
 
 
+def _read_trash_meta(meta_file: Path) -> Optional[dict]:
+    try:
+        return json_loads(meta_file.read_bytes())
+    except (OSError, ValueError):
+        return None
+
+
+# Parsed trash metadata by file name, with the file's mtime when it was
+# read. An entry is reused while its file keeps that mtime, so a meta file
+# edited by hand (say, to change expires_at) is read again.
+_trash_meta_cache: dict[str, tuple[int, dict]] = {}
+_trash_meta_lock = threading.Lock()
+
+
+def remember_trash_meta(name: str, meta: dict):
+    """Cache metadata we just wrote to a trash meta file."""
+    try:
+        mtime_ns = (TRASH_DIR / name).stat().st_mtime_ns
+    except OSError:
+        return
+    with _trash_meta_lock:
+        _trash_meta_cache[name] = (mtime_ns, meta)
+
+
+def _trash_meta_mtime(meta_file: Path) -> Optional[int]:
+    try:
+        return meta_file.stat().st_mtime_ns
+    except OSError:
+        return None
+
+
+def read_trash_metadata() -> list[tuple[Path, dict]]:
+    """Read all trash metadata files.
+
+    Every file is statted, and only files not seen before or changed since
+    they were read are read again, fanning the small reads out over
+    session_executor; entries for files gone from the trash are dropped.
+    """
+    meta_files = all_trash_files(".meta.json")
+    # Stats and reads are leaf jobs on the shared pool, so no threads are
+    # started per request
+    mtimes = dict(zip((f.name for f in meta_files), session_executor.map(_trash_meta_mtime, meta_files)))
+    with _trash_meta_lock:
+        known = dict(_trash_meta_cache)
+    unread = [
+        f for f in meta_files
+        if mtimes[f.name] is not None and known.get(f.name, (None,))[0] != mtimes[f.name]
+    ]
+    for meta_file, meta in zip(unread, session_executor.map(_read_trash_meta, unread)):
+        if meta is not None:
+            known[meta_file.name] = (mtimes[meta_file.name], meta)
+    current = {
+        name: entry for name, entry in known.items()
+        if name in mtimes and entry[0] == mtimes[name]
+    }
+    with _trash_meta_lock:
+        _trash_meta_cache.clear()
+        _trash_meta_cache.update(current)
+    return [(f, current[f.name][1]) for f in meta_files if f.name in current]
+
+
 @app.get("/trash")
 @limiter.limit("60/minute")
 def list_trash(request: Request, api_key: str = Depends(verify_api_key)):
@@ -896,16 +1836,9 @@ def list_trash(request: Request, api_key: str = Depends(verify_api_key)):
     if not TRASH_DIR.exists():
         return {"sessions": []}
 
-    sessions = []
-    for meta_file in TRASH_DIR.glob("*.meta.json"):
-        try:
-            with open(meta_file, "r") as f:
-                meta = json.load(f)
-            sessions.append(meta)
-        except:
-            continue
+    sessions = [meta for _, meta in read_trash_metadata()]
 
-    return {"sessions": sorted(sessions, key=lambda s: s.get("trashed_at", ""), reverse=True)}
+    return FastJSONResponse({"sessions": sorted(sessions, key=lambda s: s.get("trashed_at", ""), reverse=True)})
 
 
 @app.delete("/trash/{agent}/{session_id}")
@@ -918,12 +1851,17 @@ def permanent_delete(request: Request, agent: str, session_id: str, api_key: str
     log_action("permanent_delete", agent, session_id, user=api_key)
     # Find matching files in trash
     deleted = False
-    for trash_file in TRASH_DIR.glob(f"{agent}_{session_id}_*.jsonl"):
+    for trash_file in find_trash_files(agent, session_id, ".jsonl"):
         trash_file.unlink()
         deleted = True
-    for meta_file in TRASH_DIR.glob(f"{agent}_{session_id}_*.meta.json"):
+    for meta_file in find_trash_files(agent, session_id, ".meta.json"):
         meta_file.unlink()
+    # Drop any cached analysis still held for the session's original file
+    original_path = AGENTS_DIR / agent / "sessions" / f"{session_id}.jsonl"
+    if deleted and not original_path.exists():
+        forget_analysis(original_path)
 
+    invalidate_trash_index()
     return {"deleted": deleted, "id": session_id}
 
 
@@ -937,17 +1875,18 @@ def restore_from_trash(request: Request, agent: str, session_id: str, api_key: s
     log_action("restore", agent, session_id, user=api_key)
 
     # Find the trashed session file
-    trash_files = list(TRASH_DIR.glob(f"{agent}_{session_id}_*.jsonl"))
+    trash_files = find_trash_files(agent, session_id, ".jsonl")
     if not trash_files:
         raise HTTPException(status_code=404, detail="Session not found in trash")
 
-    trash_path = trash_files[0]
+    # Restore the newest copy if the session was trashed more than once;
+    # names sort by their trash timestamp
+    trash_path = trash_files[-1]
     meta_path = trash_path.with_suffix(".meta.json")
 
     # Read metadata
     try:
-        with open(meta_path, "r") as f:
-            meta = json.load(f)
+        meta = json_loads(meta_path.read_bytes())
         original_path = Path(meta["original_path"])
     except:
         # Fallback: reconstruct path from agent/session_id
@@ -962,34 +1901,28 @@ def restore_from_trash(request: Request, agent: str, session_id: str, api_key: s
     # Try to remove from trash (may fail if owned by root)
     try:
         trash_path.unlink()
-        if meta_path.exists():
-            meta_path.unlink()
+        meta_path.unlink(missing_ok=True)
     except PermissionError:
         # File restored but couldn't clean up trash (owned by root)
         pass
 
     # Re-add to sessions.json if it was removed
-    sessions_file = AGENTS_DIR / agent / "sessions" / "sessions.json"
-    if sessions_file.exists():
-        try:
-            with open(sessions_file, "r") as f:
-                sessions = json.load(f)
-        except:
-            sessions = []
-
+    def re_add_session(data: dict, index: SessionsIndex) -> bool:
         # Check if already in sessions.json
-        exists = any(s.get("sessionId") == session_id for s in sessions)
-        if not exists:
-            sessions.append({
-                "sessionId": session_id,
-                "label": session_id[:8],
-                "agentId": agent,
-                "createdAt": datetime.now(timezone.utc).isoformat(),
-                "restored": True
-            })
-            with open(sessions_file, "w") as f:
-                json.dump(sessions, f, indent=2)
+        if session_id in index.by_id:
+            return False
+        data[session_id] = {
+            "sessionId": session_id,
+            "label": session_id[:8],
+            "agentId": agent,
+            "createdAt": datetime.now(timezone.utc).isoformat(),
+            "restored": True
+        }
+        return True
 
+    update_agent_sessions(agent, re_add_session)
+
+    invalidate_trash_index()
     return {"restored": True, "id": session_id, "path": str(original_path)}
 
 
@@ -1002,24 +1935,28 @@ def cleanup_trash(request: Request, api_key: str = Depends(require_write_access)
     if not TRASH_DIR.exists():
         return {"cleaned": 0}
 
-    now = datetime.now(timezone.utc)
-    cleaned = 0
+    now = time.time()
+    expired = []
+    for meta_file, meta in read_trash_metadata():
+        if not isinstance(meta, dict):
+            continue
+        expires_at = parse_iso_timestamp(meta.get("expires_at"))
+        if expires_at is not None and expires_at < now:
+            expired.append(meta_file)
 
-    for meta_file in TRASH_DIR.glob("*.meta.json"):
+    def delete_expired(meta_file: Path) -> bool:
         try:
-            with open(meta_file, "r") as f:
-                meta = json.load(f)
-            expires_at = datetime.fromisoformat(meta["expires_at"].replace("Z", "+00:00"))
-            if expires_at < now:
-                # Delete the session file
-                session_file = meta_file.with_suffix(".jsonl")
-                if session_file.exists():
-                    session_file.unlink()
-                meta_file.unlink()
-                cleaned += 1
-        except:
-            continue
+            # Delete the session file; with_suffix would give "*.meta.jsonl"
+            meta_file.with_name(meta_file.name.removesuffix(".meta.json") + ".jsonl").unlink(missing_ok=True)
+            meta_file.unlink()
+            return True
+        except OSError:
+            return False
 
+    # Unlinks are independent directory operations; overlap them on the shared pool
+    cleaned = sum(session_executor.map(delete_expired, expired))
+
+    invalidate_trash_index()
     return {"cleaned": cleaned}
 
 
@@ -1033,21 +1970,7 @@ def prune_session(request: Request, agent: str, session_id: str, req: PruneReque
     log_action("prune", agent, session_id, user=api_key, details={"keep_recent": req.keep_recent})
 
     filepath = AGENTS_DIR / agent / "sessions" / f"{session_id}.jsonl"
-    if not filepath.exists():
-        raise HTTPException(status_code=404, detail="Session not found")
-
-    # Read all entries
-    entries = []
-    with open(filepath, "r", encoding="utf-8") as f:
-        for line in f:
-            line = line.strip()
-            if line:
-                try:
-                    entries.append(json.loads(line))
-                except:
-                    entries.append({"_raw": line})
-
-    original_size = filepath.stat().st_size
+    original_size = stat_session_file(filepath).st_size
     pruned_count = 0
     
     # Determine prune mode based on keep_recent:
@@ -1055,108 +1978,131 @@ def prune_session(request: Request, agent: str, session_id: str, req: PruneReque
     # keep_recent = 0 means remove ALL tool content
     # keep_recent > 0 means keep that many recent calls
     
-    prune_mode = req.keep_recent if req.keep_recent > 0 else 3  # default
+    prune_mode = req.keep_recent if req.keep_recent >= 0 else 3  # default
     light_prune = req.keep_recent == -1
     
-    # Find tool-related entries
+    # First pass: classify entries without keeping them in memory.
     # In OpenClaw format: role=tool or role=toolResult in message content
-    tool_indices = []
-    for i, e in enumerate(entries):
-        entry_type = e.get("type", "")
-        if entry_type == "tool":
-            tool_indices.append(i)
-        elif entry_type == "tool_result":
-            tool_indices.append(i)
-        elif entry_type == "message":
-            msg = e.get("message", {})
-            role = msg.get("role", "")
-            if role in ("tool", "toolResult"):
-                tool_indices.append(i)
-            # Also check for tool calls in content array
-            content = msg.get("content", [])
-            if isinstance(content, list):
-                for j, item in enumerate(content):
-                    if isinstance(item, dict):
-                        if item.get("type") == "toolCall":
-                            # Mark this entry as containing tool calls
-                            e["_has_tool_calls"] = True
-                        if item.get("type") == "toolResult":
-                            e["_has_tool_results"] = True
+    # Only the most recent prune_mode tool entries are ever kept
+    recent_tools = deque(maxlen=prune_mode)
+    prunable = {}  # entry index -> what full prune replaces
+    long_responses = set()  # assistant responses light prune summarizes
+    spans = {}  # entry index -> (offset, length) of its line, for the above
+    # Everything full prune rewrites has a "tool..." type, role or key, so a
+    # file without that string anywhere has nothing to classify
+    if light_prune or file_contains(filepath, b'"tool'):
+        with open_jsonl_lines(filepath) as lines:
+            i = -1
+            offset = 0
+            for raw in lines:
+                line_offset = offset
+                offset += len(raw)
+                line = raw.strip()
+                if not line:
+                    continue
+                i += 1
+                # Light prune only touches responses over 5000 chars, which
+                # can't fit in a shorter line
+                if light_prune and len(line) <= 5000:
+                    continue
+                if light_prune and (ASSISTANT_ROLE_BYTES not in line or not STRING_CONTENT_RE.search(line)):
+                    continue
+                span = (line_offset, len(raw.rstrip(b"\r\n")))
+                if len(line) > LARGE_LINE_BYTES and line.endswith(b"}"):
+                    header = TOOL_OUTPUT_HEADER_RE.match(line, 0, LINE_HEADER_BYTES)
+                    if header and (header.group(1) != b"message" or header.group(3)):
+                        # Large tool output, classified from its header alone
+                        if not light_prune:
+                            recent_tools.append(i)
+                            prunable[i] = "toolResult" if header.group(3) else header.group(1).decode()
+                            spans[i] = span
+                        continue
+                try:
+                    e = json_loads(line)
+                except ValueError:
+                    continue
+                if not isinstance(e, dict):
+                    continue
+                entry_type = e.get("type", "")
+                if light_prune:
+                    # Only long assistant responses matter to light prune
+                    msg = e.get("message") if entry_type == "message" else None
+                    if isinstance(msg, dict) and msg.get("role") == "assistant":
+                        content = msg.get("content")
+                        if isinstance(content, str) and len(content) > 5000:
+                            long_responses.add(i)
+                            spans[i] = span
+                    continue
+                if entry_type in ("tool", "tool_result"):
+                    recent_tools.append(i)
+                    prunable[i] = entry_type
+                    spans[i] = span
+                elif entry_type == "message":
+                    msg = e.get("message", {})
+                    role = msg.get("role", "")
+                    if role in ("tool", "toolResult"):
+                        recent_tools.append(i)
+                    if role == "toolResult":
+                        prunable[i] = "toolResult"
+                        spans[i] = span
+                    elif role == "assistant" and msg.get("tool_calls"):
+                        prunable[i] = "tool_calls"
+                        spans[i] = span
 
     # Calculate which entries to prune
     if light_prune:
         # Light prune: summarize long content, replace with [pruned]
-        for i, entry in enumerate(entries):
-            entry_type = e.get("type", "")
-            
-            # Prune message content for assistant responses that are too long
-            if entry_type == "message":
-                msg = entry.get("message", {})
-                if msg.get("role") == "assistant":
-                    content = msg.get("content", "")
-                    if isinstance(content, str) and len(content) > 5000:
-                        # Replace with summary
-                        summary = content[:500] + f"\n\n[... {len(content) - 5000} chars pruned ...]"
-                        msg["content"] = summary
-                        entry["message"] = msg
-                        entry["_pruned"] = True
-                        entry["_pruned_type"] = "light"
-                        pruned_count += 1
+        to_rewrite = long_responses
     else:
-        # Full prune mode
-        to_keep = set()
-        
-        # Find indices to keep (recent tool calls)
-        if prune_mode > 0:
-            recent_tools = tool_indices[-prune_mode:] if len(tool_indices) > prune_mode else tool_indices
-            to_keep = set(recent_tools)
-        
-        # Replace pruned entries with [pruned]
-        for i, entry in enumerate(entries):
-            entry_type = entry.get("type", "")
-            
-            if entry_type == "tool":
-                if i not in to_keep:
-                    entry["type"] = "tool"
+        # Full prune mode: keep the most recent tool calls
+        to_keep = set(recent_tools)
+        to_rewrite = {i for i in prunable if i not in to_keep}
+
+    if not to_rewrite:
+        # Nothing to prune: leave the file untouched
+        return {
+            "pruned": True,
+            "entries_pruned": 0,
+            "original_size": original_size,
+            "new_size": original_size,
+            "saved_bytes": 0,
+            "mode": "light" if light_prune else "full",
+        }
+
+    # Second pass: copy the bytes between pruned lines in large blocks and
+    # rewrite only the pruned lines themselves
+    with open(filepath, "rb") as src, atomic_write(filepath) as dst:
+        pos = 0
+        for i in sorted(to_rewrite):
+            start, length = spans[i]
+            copy_bytes(src, dst, start - pos)
+            entry = json_loads(src.read(length))
+            pos = start + length
+            if light_prune:
+                # Prune message content for assistant responses that are too long
+                msg = entry["message"]
+                content = msg["content"]
+                msg["content"] = content[:500] + f"\n\n[... {len(content) - 5000} chars pruned ...]"
+                entry["_pruned_type"] = "light"
+            else:
+                kind = prunable[i]
+                if kind == "tool":
                     entry["content"] = "[pruned]"
                     entry["name"] = "[pruned]"
-                    entry["_pruned"] = True
-                    entry["_pruned_type"] = "full"
-                    pruned_count += 1
-            elif entry_type == "tool_result":
-                if i not in to_keep:
-                    entry["type"] = "tool_result"
+                elif kind == "tool_result":
                     entry["content"] = "[pruned]"
-                    entry["_pruned"] = True
-                    entry["_pruned_type"] = "full"
-                    pruned_count += 1
-            elif entry_type == "message":
-                msg = entry.get("message", {})
-                role = msg.get("role", "")
-                
-                # Prune tool calls in content array
-                if role == "assistant" and msg.get("tool_calls"):
-                    # Keep tool calls but mark as pruned if not in keep set
-                    if i not in to_keep:
-                        msg["tool_calls"] = [{"_pruned": True, "type": "toolCall", "id": "[pruned]", "name": "[pruned]"}]
-                        entry["message"] = msg
-                        entry["_pruned"] = True
-                        entry["_pruned_type"] = "full"
-                        pruned_count += 1
-                
-                # Prune tool results
-                if role == "toolResult":
-                    if i not in to_keep:
-                        msg["content"] = "[pruned]"
-                        entry["message"] = msg
-                        entry["_pruned"] = True
-                        entry["_pruned_type"] = "full"
-                        pruned_count += 1
-
-    # Write back
-    with open(filepath, "w", encoding="utf-8") as f:
-        for entry in entries:
-            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                elif kind == "tool_calls":
+                    # Keep tool calls but mark as pruned
+                    entry["message"]["tool_calls"] = [{"_pruned": True, "type": "toolCall", "id": "[pruned]", "name": "[pruned]"}]
+                else:
+                    entry["message"]["content"] = "[pruned]"
+                entry["_pruned_type"] = "full"
+            entry["_pruned"] = True
+            pruned_count += 1
+            dst.write(json_dumps(entry))
+        shutil.copyfileobj(src, dst, WRITE_BUFFER_BYTES)
+    # atomic_write may have rewritten the file in place, keeping its inode
+    forget_analysis(filepath)
 
     new_size = filepath.stat().st_size
 
@@ -1173,37 +2119,62 @@ def prune_session(request: Request, agent: str, session_id: str, req: PruneReque
 @app.put("/sessions/{agent}/{session_id}/entries/{index}")
 @limiter.limit("60/minute")
 def edit_entry(request: Request, agent: str, session_id: str, index: int, req: EditEntryRequest, api_key: str = Depends(require_write_access)):
-    """Edit a specific session entry."""
+    """Edit a specific session entry.
+
+    An entry that fits in its old line, padded with spaces, and whose line
+    lies within one filesystem block is overwritten in place; common
+    filesystems don't tear a write within one block on a crash. Any other
+    edit rewrites the file through atomic_write.
+    """
     agent = sanitize_path_component(agent, "agent")
     session_id = sanitize_path_component(session_id, "session_id")
 
     log_action("edit_entry", agent, session_id, user=api_key, details={"index": index})
 
     filepath = AGENTS_DIR / agent / "sessions" / f"{session_id}.jsonl"
-    if not filepath.exists():
+    block_size = stat_session_file(filepath).st_blksize or 4096
+    # Find the byte range of the entry; indices count non-blank lines
+    offset = 0
+    target = None
+    i = -1
+    try:
+        with open_jsonl_lines(filepath) as lines:
+            for raw in lines:
+                if raw.strip():
+                    i += 1
+                    if i == index:
+                        target = (offset, len(raw.rstrip(b"\r\n")))
+                        break
+                offset += len(raw)
+    except FileNotFoundError:
         raise HTTPException(status_code=404, detail="Session not found")
 
-    # Read all entries
-    entries = []
-    with open(filepath, "r", encoding="utf-8") as f:
-        for line in f:
-            line = line.strip()
-            if line:
-                try:
-                    entries.append(json.loads(line))
-                except:
-                    entries.append({"_raw": line})
-
-    if index < 0 or index >= len(entries):
+    if index < 0 or target is None:
         raise HTTPException(status_code=400, detail="Invalid entry index")
 
-    # Update entry
-    entries[index] = req.entry
-
-    # Write back
-    with open(filepath, "w", encoding="utf-8") as f:
-        for entry in entries:
-            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+    encoded = json_dumps(req.entry)
+    start, length = target
+    if len(encoded) <= length and start // block_size == (start + length - 1) // block_size:
+        # The new entry fits in the old line: overwrite just that line,
+        # padding with whitespace, which JSON parsers ignore
+        fd = os.open(filepath, os.O_WRONLY)
+        try:
+            os.pwrite(fd, encoded.ljust(length), start)
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        # Same inode, so a later append must not be merged into the old analysis
+        forget_analysis(filepath)
+    else:
+        # Grown or spanning blocks: copy the bytes around the replaced line
+        # in large blocks rather than line by line
+        with open(filepath, "rb") as src, atomic_write(filepath) as dst:
+            copy_bytes(src, dst, start)
+            dst.write(encoded)
+            src.seek(start + length)
+            shutil.copyfileobj(src, dst, WRITE_BUFFER_BYTES)
+        # atomic_write may have rewritten the file in place, keeping its inode
+        forget_analysis(filepath)
 
     return {"updated": True, "index": index}
 
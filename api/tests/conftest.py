@@ -0,0 +1,81 @@
+import json
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+# Keep the analysis cache in memory; read when main is imported
+os.environ["BRAINSURGEON_CACHE_DB"] = ""
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from api import main  # noqa: E402
+
+
+@pytest.fixture
+def sessions_dir(tmp_path, monkeypatch):
+    """An empty sessions directory for agent "main", with caches and rate limits out of the way."""
+    monkeypatch.setattr(main, "AGENTS_DIR", tmp_path / "agents")
+    monkeypatch.setattr(main, "TRASH_DIR", tmp_path / "trash")
+    monkeypatch.setattr(main, "metadata_cache", None)
+    monkeypatch.setattr(main.limiter, "enabled", False)
+    main._analysis_cache.clear()
+    path = tmp_path / "agents" / "main" / "sessions"
+    path.mkdir(parents=True)
+    return path
+
+
+@pytest.fixture
+def client(sessions_dir):
+    from fastapi.testclient import TestClient
+    return TestClient(main.app)
+
+
+def write_jsonl(path: Path, entries: list[dict], mode: str = "w"):
+    """Write entries one per line, alternating stdlib and compact (OpenClaw) formatting."""
+    with open(path, mode, encoding="utf-8") as f:
+        for i, entry in enumerate(entries):
+            separators = (",", ":") if i % 2 else None
+            f.write(json.dumps(entry, ensure_ascii=False, separators=separators) + "\n")
+
+
+def read_jsonl(path: Path) -> list[dict]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def sample_entries(start: int = 0, count: int = 12) -> list[dict]:
+    """A mix of the entry kinds _scan_lines and prune_session tell apart.
+
+    Every few entries is a tool output over LARGE_LINE_BYTES, so the
+    header-only fast paths are exercised too.
+    """
+    big = "output line\n" * 600
+    entries = []
+    for i in range(start, start + count):
+        ts = f"2026-01-01T{i // 60:02d}:{i % 60:02d}:00Z"
+        base = {"type": "message", "id": f"e{i}", "parentId": f"e{i - 1}" if i else None, "timestamp": ts}
+        kind = i % 8
+        if kind == 0:
+            entries.append({**base, "message": {"role": "user", "content": [{"type": "text", "text": f"request {i}"}]}})
+        elif kind == 1:
+            entries.append({**base, "message": {
+                "role": "assistant", "model": f"model-{i % 3}",
+                "content": [{"type": "text", "text": "calling"}, {"type": "toolCall", "id": f"c{i}", "name": "exec"}],
+            }})
+        elif kind == 2:
+            entries.append({**base, "message": {"role": "toolResult", "toolCallId": f"c{i - 1}", "content": [{"type": "text", "text": big}]}})
+        elif kind == 3:
+            entries.append({**base, "message": {"role": "assistant", "content": "x" * 6000 + f" long answer {i}"}})
+        elif kind == 4:
+            entries.append({**base, "message": {
+                "role": "assistant", "model": "model-b", "content": "short",
+                "tool_calls": [{"id": f"t{i}", "function": {"name": "search"}}],
+            }})
+        elif kind == 5:
+            entries.append({"type": "tool_result", "timestamp": ts, "content": big if i % 2 else "small"})
+        elif kind == 6:
+            entries.append({"type": "tool", "timestamp": ts, "name": "exec", "content": big})
+        else:
+            entries.append({"type": "custom", "customType": "model-snapshot", "timestamp": ts, "data": {"modelId": f"snap-{i}"}})
+    return entries
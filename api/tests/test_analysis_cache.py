@@ -0,0 +1,127 @@
+"""analyze_jsonl_cached: incremental scans of appended lines must match a full rescan."""
+
+import os
+
+import pytest
+
+from conftest import main, sample_entries, write_jsonl
+
+# Unpatched, so reference rescans aren't counted by full_scans
+scan_file = main._scan_file
+
+
+def normalized(analysis: dict) -> dict:
+    return {
+        **analysis,
+        "models": sorted(analysis["models"]),
+        "snapshot_models": sorted(analysis["snapshot_models"]),
+    }
+
+
+def full_rescan(path) -> dict:
+    return normalized(scan_file(path, path.stat().st_size)[0])
+
+
+def bump_mtime(path):
+    """Move the mtime forward, so a same-size rewrite still changes the stamp."""
+    st = path.stat()
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+
+@pytest.fixture
+def full_scans(monkeypatch):
+    """Count the full scans analyze_jsonl_cached falls back to."""
+    calls = []
+
+    def counting_scan_file(filepath, size):
+        calls.append(filepath)
+        return scan_file(filepath, size)
+
+    monkeypatch.setattr(main, "_scan_file", counting_scan_file)
+    return calls
+
+
+def test_appends_match_full_rescan(sessions_dir, full_scans):
+    path = sessions_dir / "s.jsonl"
+    write_jsonl(path, sample_entries(0, 10))
+    assert normalized(main.analyze_jsonl_cached(path)) == full_rescan(path)
+
+    for start in (10, 13, 30):
+        write_jsonl(path, sample_entries(start, 3 if start < 30 else 17), mode="a")
+        assert normalized(main.analyze_jsonl_cached(path)) == full_rescan(path)
+
+    # Only the first analysis scanned the whole file
+    assert len(full_scans) == 1
+
+
+def test_append_after_partial_line_rescans(sessions_dir, full_scans):
+    path = sessions_dir / "s.jsonl"
+    write_jsonl(path, sample_entries(0, 5))
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"type": "message", "timestamp": "2026-01-02T00:00:00Z", ')
+    main.analyze_jsonl_cached(path)
+
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('"message": {"role": "user", "content": "done"}}\n')
+    analysis = main.analyze_jsonl_cached(path)
+    assert normalized(analysis) == full_rescan(path)
+    assert analysis["updated"] == "2026-01-02T00:00:00Z"
+    # A scan ending mid-line leaves no edge, so the second scan is a full one
+    assert len(full_scans) == 2
+
+
+def test_rewritten_file_falls_back_to_full_scan(sessions_dir, full_scans):
+    path = sessions_dir / "s.jsonl"
+    write_jsonl(path, sample_entries(0, 8))
+    main.analyze_jsonl_cached(path)
+    inode = path.stat().st_ino
+
+    # Same inode and longer, but the bytes at the old end are different
+    write_jsonl(path, sample_entries(40, 16))
+    bump_mtime(path)
+    assert path.stat().st_ino == inode
+
+    assert normalized(main.analyze_jsonl_cached(path)) == full_rescan(path)
+    assert len(full_scans) == 2
+
+
+def test_truncated_file_falls_back_to_full_scan(sessions_dir, full_scans):
+    path = sessions_dir / "s.jsonl"
+    write_jsonl(path, sample_entries(0, 12))
+    main.analyze_jsonl_cached(path)
+
+    write_jsonl(path, sample_entries(0, 4))
+    bump_mtime(path)
+    assert normalized(main.analyze_jsonl_cached(path)) == full_rescan(path)
+    assert len(full_scans) == 2
+
+    # Appends after the rescan are incremental again
+    write_jsonl(path, sample_entries(4, 6), mode="a")
+    assert normalized(main.analyze_jsonl_cached(path)) == full_rescan(path)
+    assert len(full_scans) == 2
+
+
+def test_appends_after_restart_use_persisted_analysis(sessions_dir, tmp_path, monkeypatch, full_scans):
+    monkeypatch.setattr(main, "metadata_cache", main.MetadataCache(str(tmp_path / "cache.db")))
+    path = sessions_dir / "s.jsonl"
+    write_jsonl(path, sample_entries(0, 9))
+    main.analyze_jsonl_cached(path)
+
+    # A restart empties the in-memory cache; the SQLite row remains
+    main._analysis_cache.clear()
+    write_jsonl(path, sample_entries(9, 7), mode="a")
+    assert normalized(main.analyze_jsonl_cached(path)) == full_rescan(path)
+    assert len(full_scans) == 1
+
+
+@pytest.mark.parametrize("inode", [5, 2**63 - 1, 2**63, 2**64 - 1])
+def test_persisted_inode_round_trips(tmp_path, inode):
+    cache = main.MetadataCache(str(tmp_path / "cache.db"))
+    cache.put("/s.jsonl", ((1, 2), {"messages": 1}, inode, b"edge\n"))
+    assert cache.get("/s.jsonl") == ((1, 2), {"messages": 1}, inode, b"edge\n")
+
+
+def test_unstorable_entry_is_a_cache_miss(tmp_path):
+    cache = main.MetadataCache(str(tmp_path / "cache.db"))
+    cache.put("/s.jsonl", ((2**64, 2), {}, 1, b"edge\n"))
+    assert cache.get("/s.jsonl") is None
@@ -0,0 +1,133 @@
+"""prune_session and edit_entry rewrite lines in place; results must match a parse-everything rewrite."""
+
+import copy
+import os
+
+import pytest
+
+from conftest import read_jsonl, sample_entries, write_jsonl
+
+
+def reference_prune(entries: list[dict], keep_recent: int) -> tuple[list[dict], int]:
+    """The original json.load/json.dump prune, with the fixes made since.
+
+    keep_recent=0 prunes every tool entry, light prune checks each entry's
+    own type, and no _has_tool_calls/_has_tool_results markers are written.
+    """
+    entries = copy.deepcopy(entries)
+    pruned = 0
+    if keep_recent == -1:
+        for entry in entries:
+            msg = entry.get("message", {}) if entry.get("type") == "message" else {}
+            content = msg.get("content")
+            if msg.get("role") == "assistant" and isinstance(content, str) and len(content) > 5000:
+                msg["content"] = content[:500] + f"\n\n[... {len(content) - 5000} chars pruned ...]"
+                entry.update(_pruned=True, _pruned_type="light")
+                pruned += 1
+        return entries, pruned
+
+    tool_indices = []
+    for i, e in enumerate(entries):
+        if e.get("type") in ("tool", "tool_result"):
+            tool_indices.append(i)
+        elif e.get("type") == "message" and e["message"].get("role") in ("tool", "toolResult"):
+            tool_indices.append(i)
+    to_keep = set(tool_indices[-keep_recent:]) if keep_recent else set()
+
+    for i, entry in enumerate(entries):
+        if i in to_keep:
+            continue
+        entry_type = entry.get("type")
+        msg = entry.get("message", {})
+        if entry_type == "tool":
+            entry.update(content="[pruned]", name="[pruned]")
+        elif entry_type == "tool_result":
+            entry["content"] = "[pruned]"
+        elif entry_type == "message" and msg.get("role") == "assistant" and msg.get("tool_calls"):
+            msg["tool_calls"] = [{"_pruned": True, "type": "toolCall", "id": "[pruned]", "name": "[pruned]"}]
+        elif entry_type == "message" and msg.get("role") == "toolResult":
+            msg["content"] = "[pruned]"
+        else:
+            continue
+        entry.update(_pruned=True, _pruned_type="full")
+        pruned += 1
+    return entries, pruned
+
+
+@pytest.fixture
+def session(sessions_dir):
+    path = sessions_dir / "s1.jsonl"
+    write_jsonl(path, sample_entries(0, 40))
+    return path
+
+
+@pytest.mark.parametrize("keep_recent", [-1, 0, 1, 3, 100])
+def test_prune_matches_reference(client, session, keep_recent):
+    original = read_jsonl(session)
+    expected, expected_count = reference_prune(original, keep_recent)
+
+    response = client.post("/sessions/main/s1/prune", json={"keep_recent": keep_recent})
+    assert response.status_code == 200
+    result = response.json()
+
+    assert read_jsonl(session) == expected
+    assert result["entries_pruned"] == expected_count
+    assert result["mode"] == ("light" if keep_recent == -1 else "full")
+    assert result["new_size"] == session.stat().st_size
+
+
+def test_prune_without_tool_entries_leaves_file_untouched(client, sessions_dir):
+    path = sessions_dir / "s1.jsonl"
+    write_jsonl(path, [e for e in sample_entries(0, 16) if e["type"] == "message" and e["message"]["role"] == "user"])
+    before = path.read_bytes()
+
+    result = client.post("/sessions/main/s1/prune", json={"keep_recent": 0}).json()
+    assert result["entries_pruned"] == 0
+    assert path.read_bytes() == before
+
+
+def edit(client, index: int, entry: dict):
+    return client.put(f"/sessions/main/s1/entries/{index}", json={"index": index, "entry": entry})
+
+
+@pytest.mark.parametrize("index", [0, 3, 39])
+def test_grown_edit_matches_reference(client, session, index):
+    expected = read_jsonl(session)
+    expected[index] = {"type": "message", "message": {"role": "user", "content": "y" * 20000}}
+
+    assert edit(client, index, expected[index]).status_code == 200
+    assert read_jsonl(session) == expected
+
+
+def test_shrunk_edit_within_block_is_in_place(client, session):
+    expected = read_jsonl(session)
+    expected[0] = {"type": "message", "message": {"role": "user", "content": "hi"}}
+    inode = session.stat().st_ino
+    size = session.stat().st_size
+
+    assert edit(client, 0, expected[0]).status_code == 200
+    assert read_jsonl(session) == expected
+    # Padded over the old line: same file, same length
+    assert session.stat().st_ino == inode
+    assert session.stat().st_size == size
+
+
+def test_shrunk_edit_spanning_blocks_is_rewritten(client, session):
+    # Entry 2 is a tool output over LARGE_LINE_BYTES, so its line crosses a block boundary
+    expected = read_jsonl(session)
+    expected[2] = {"type": "message", "message": {"role": "toolResult", "content": "[edited]"}}
+    size = session.stat().st_size
+
+    assert edit(client, 2, expected[2]).status_code == 200
+    assert read_jsonl(session) == expected
+    assert session.stat().st_size < size
+
+
+def test_edit_rejects_out_of_range_index(client, session):
+    before = session.read_bytes()
+    assert edit(client, 40, {"type": "message"}).status_code == 400
+    assert session.read_bytes() == before
+
+
+def test_edit_of_missing_session_is_404(client, sessions_dir):
+    assert edit(client, 0, {"type": "message"}).status_code == 404
@@ -0,0 +1,111 @@
+"""Read endpoints: batch analysis, conditional GETs and entry pages."""
+
+import json
+
+from conftest import main, sample_entries, write_jsonl
+
+
+def write_index(sessions_dir, *session_ids):
+    (sessions_dir / "sessions.json").write_text(json.dumps({
+        f"agent:main:{sid}": {"sessionId": sid, "label": f"label {sid}"} for sid in session_ids
+    }))
+
+
+def test_analyze_returns_sessions_in_request_order(client, sessions_dir):
+    write_jsonl(sessions_dir / "s1.jsonl", sample_entries(0, 4))
+    write_jsonl(sessions_dir / "s2.jsonl", sample_entries(0, 9))
+    # s3 is only in sessions.json; s2 only has a file
+    write_index(sessions_dir, "s1", "s3")
+
+    response = client.post("/sessions/analyze", json={"ids": [
+        ["main", "s2"], ["main", "nope"], ["main", "s3"], ["main", "s1"], ["other", "s1"],
+    ]})
+    assert response.status_code == 200
+    assert "etag" not in response.headers
+    result = response.json()
+
+    assert [s["id"] for s in result["sessions"]] == ["s2", "s3", "s1"]
+    assert result["missing"] == [["main", "nope"], ["other", "s1"]]
+    s2, s3, s1 = result["sessions"]
+    assert s1["label"] == "label s1" and s2["label"] == "s2"
+    assert s3["size"] == 0 and s3["messages"] == 0
+    assert s2["size"] == (sessions_dir / "s2.jsonl").stat().st_size
+    assert result["total_size"] == s1["size"] + s2["size"]
+
+
+def test_analyze_rejects_oversized_batch(client, sessions_dir):
+    ids = [["main", f"s{i}"] for i in range(main.ANALYZE_BATCH_MAX_IDS + 1)]
+    assert client.post("/sessions/analyze", json={"ids": ids}).status_code == 400
+    assert client.post("/sessions/analyze", json={"ids": ids[:-1]}).status_code == 200
+
+
+def test_unchanged_session_revalidates_with_304(client, sessions_dir):
+    write_jsonl(sessions_dir / "s1.jsonl", sample_entries(0, 6))
+    first = client.get("/sessions/main/s1")
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+
+    again = client.get("/sessions/main/s1", headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.content == b""
+    assert again.headers["etag"] == etag
+    # Weak and listed tags match too
+    assert client.get("/sessions/main/s1", headers={"If-None-Match": f'"other", W/{etag}'}).status_code == 304
+
+
+def test_changed_session_gets_new_etag(client, sessions_dir):
+    path = sessions_dir / "s1.jsonl"
+    write_jsonl(path, sample_entries(0, 6))
+    etag = client.get("/sessions/main/s1").headers["etag"]
+
+    write_jsonl(path, sample_entries(6, 2), mode="a")
+    changed = client.get("/sessions/main/s1", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+    assert len(changed.json()["entries"]) == 8
+
+    listing = client.get("/sessions")
+    assert client.get("/sessions", headers={"If-None-Match": listing.headers["etag"]}).status_code == 304
+
+
+def test_entry_pages(client, sessions_dir):
+    path = sessions_dir / "s1.jsonl"
+    write_jsonl(path, sample_entries(0, 25))
+    expected = [e["timestamp"] for e in sample_entries(0, 25)]
+
+    seen = []
+    offset = 0
+    while True:
+        page = client.get("/sessions/main/s1/entries", params={"offset": offset, "limit": 10}).json()
+        assert page["offset"] == offset and page["limit"] == 10
+        seen += [e["timestamp"] for e in page["entries"]]
+        if not page["has_more"]:
+            break
+        offset += 10
+    assert seen == expected
+    assert offset == 20
+
+    exact = client.get("/sessions/main/s1/entries", params={"offset": 15, "limit": 10}).json()
+    assert len(exact["entries"]) == 10 and exact["has_more"] is False
+    past_end = client.get("/sessions/main/s1/entries", params={"offset": 30}).json()
+    assert past_end["entries"] == [] and past_end["has_more"] is False
+    assert client.get("/sessions/main/s1/entries", params={"limit": 0}).status_code == 422
+
+
+def test_unparseable_line_keeps_its_edit_index(client, sessions_dir):
+    path = sessions_dir / "s1.jsonl"
+    write_jsonl(path, sample_entries(0, 2))
+    # Blank lines don't count as entries; the broken line is entry 2
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('\n{"type": "message", "broken\n\n')
+    write_jsonl(path, sample_entries(2, 2), mode="a")
+
+    entries = client.get("/sessions/main/s1/entries").json()["entries"]
+    assert len(entries) == 5
+    assert entries[2] == {"_raw": '{"type": "message", "broken'}
+
+    fixed = {"type": "message", "message": {"role": "user", "content": "fixed"}}
+    assert client.put("/sessions/main/s1/entries/2", json={"index": 2, "entry": fixed}).status_code == 200
+    entries_after = client.get("/sessions/main/s1/entries").json()["entries"]
+    assert entries_after[2] == fixed
+    assert entries_after[:2] + entries_after[3:] == entries[:2] + entries[3:]
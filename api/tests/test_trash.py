@@ -0,0 +1,25 @@
+"""Trash: restoring sessions that were trashed more than once."""
+
+import json
+
+from conftest import main, read_jsonl, write_jsonl
+
+
+def test_restore_takes_newest_trashed_copy(client, sessions_dir):
+    trash = main.TRASH_DIR
+    trash.mkdir()
+    for stamp, text in (("20260101_000000", "old"), ("20260102_000000", "new")):
+        name = f"main_s1_{stamp}"
+        write_jsonl(trash / f"{name}.jsonl", [{"type": "message", "message": {"role": "user", "content": text}}])
+        (trash / f"{name}.meta.json").write_text(json.dumps({
+            "original_agent": "main",
+            "original_session_id": "s1",
+            "original_path": str(sessions_dir / "s1.jsonl"),
+        }))
+
+    assert client.post("/trash/main/s1/restore").status_code == 200
+    assert read_jsonl(sessions_dir / "s1.jsonl")[0]["message"]["content"] == "new"
+    assert sorted(p.name for p in trash.iterdir()) == [
+        "main_s1_20260101_000000.jsonl",
+        "main_s1_20260101_000000.meta.json",
+    ]